@@ -11,7 +11,11 @@ from slugify import slugify
 import dominate
 from dominate.tags import *
 import markdown
+import glob
+import html
 import os
+from functools import partial
+from multiprocessing import Pool
 
 
 # In[867]:
@@ -22,108 +26,168 @@ BAB_PATTERN = r"^BAB\s+[A-Z]+"
 BAGIAN_PATTERN = r"^Bagian\s+Ke[a-z]+"
 PARAGRAPH_PATTERN = r"^Paragraf\s+\d+"
 
-def save_cp(text, path, fn):
+BREAK_TOKEN = "<BREAK>"
+BREAK_TOKEN2 = "<BREAK2>"
+BREAK_TOKEN_PATTERNS = {
+    PASAL_PATTERN + "$": BREAK_TOKEN,
+    BAB_PATTERN + "$": BREAK_TOKEN,
+    BAGIAN_PATTERN + "$": BREAK_TOKEN,
+    PARAGRAPH_PATTERN + "$": BREAK_TOKEN,
+    r"^Menimbang\s*\:.+": BREAK_TOKEN,
+    r"^Mengingat\s*\:.+": BREAK_TOKEN,
+    r"^MEMUTUSKAN\s*\:.+": BREAK_TOKEN,
+    r"^DENGAN\s+RAHMAT\s+TUHAN\s+": BREAK_TOKEN,
+    r"^Agar\s+setiap\s+orang\s+mengetahuinya": BREAK_TOKEN
+}
+
+def cp_dir(path):
+    """ Folder of the debug files of a document: its filename without extension, in the current folder """
+
     if os.path.isfile(path):
         path = path.split("/")[-1]
         path = re.sub(r"\.[a-z0-9]+$", "", path)
     if not os.path.exists(path):
         os.mkdir(path);
-    with open(f"{path}/{fn}",'w', encoding='utf-8') as f:
+    return path
+
+def save_cp(text, path, fn):
+    with open(f"{cp_dir(path)}/{fn}",'w', encoding='utf-8') as f:
         f.write(text)
 
-def exctract_reg_text(filename):
-    def line_to_skip(text):
-        text = re.sub(r'\s+(\.\s+){3}', '...', text)
-        text = re.sub(r'\s+…', '...', text)
-        text = re.sub(r'\s+\.\.\.[^[\.]]', '...', text)
-
-        skip_patterns = [
-            "^SK\s+No\s+\d+.+?A$",
-            "^\w\.{3}$",
-            "^www.+\.go\.id%",
-            "^\-\s{0,3}\d+\s{0,3}\-",
-            "^(\d{4},\s+No.\s*\d+)",
-            "^(\d{4},\s*No.\s*\d+\s*-\s{0,3}\d+\s{0,3}\-)"
-        ]
-
-        for pattern in skip_patterns:
-            if re.match(pattern, text):
-                return True
-
-        return False
-
-    def extract_pages(doc):
-        line_text = []
-        for index, page in enumerate(doc):
-            data = page.get_text("dict")
-            for block in data['blocks']:
-                if block['type'] == 0:
-                    text = ' '.join([x['text'] for line in block['lines'] for x in line['spans']])
-                    if not line_to_skip(text):
-                        line_text.append((index, re.sub(" +", " ", text.strip())))
-
-        return line_text
-    
-    doc = fitz.open(filename)
-    lines = extract_pages(doc)
-    save_cp("\n".join([f"{x},{y}" for x, y in lines]), path=filename, fn="raw1.txt")
-    
-    break_token = "<BREAK>"; break_token2 = "<BREAK2>"
-    break_token_patterns = {
-        PASAL_PATTERN + "$": break_token,
-        BAB_PATTERN + "$": break_token,
-        BAGIAN_PATTERN + "$": break_token,
-        PARAGRAPH_PATTERN + "$": break_token,
-        r"^Menimbang\s*\:.+": break_token,
-        r"^Mengingat\s*\:.+": break_token,
-        r"^MEMUTUSKAN\s*\:.+": break_token,
-        r"^DENGAN\s+RAHMAT\s+TUHAN\s+": break_token,
-        r"^Agar\s+setiap\s+orang\s+mengetahuinya": break_token
-    }
-    
-    lines2 = [("","")]
-    for idx, (pageidx, line) in enumerate(lines): 
+def line_to_skip(text):
+    text = re.sub(r'\s+(\.\s+){3}', '...', text)
+    text = re.sub(r'\s+…', '...', text)
+    text = re.sub(r'\s+\.\.\.[^[\.]]', '...', text)
+
+    skip_patterns = [
+        "^SK\s+No\s+\d+.+?A$",
+        "^\w\.{3}$",
+        "^www.+\.go\.id%",
+        "^\-\s{0,3}\d+\s{0,3}\-",
+        "^(\d{4},\s+No.\s*\d+)",
+        "^(\d{4},\s*No.\s*\d+\s*-\s{0,3}\d+\s{0,3}\-)"
+    ]
+
+    for pattern in skip_patterns:
+        if re.match(pattern, text):
+            return True
+
+    return False
+
+def iter_lines(doc):
+    """ Text blocks of a document, page by page; a page is only read when the previous one is consumed
+
+    Yields:
+        [(int, str)]: (Page index, Text of the block)
+    """
+
+    for index, page in enumerate(doc):
+        data = page.get_text("dict")
+        for block in data['blocks']:
+            if block['type'] == 0:
+                text = ' '.join([x['text'] for line in block['lines'] for x in line['spans']])
+                if not line_to_skip(text):
+                    yield (index, re.sub(" +", " ", text.strip()))
+
+def iter_tokens(lines):
+    """ Text blocks with break tokens: BREAK_TOKEN before a heading or a new block,
+    BREAK_TOKEN2 before an item (ayat, numbered or lettered) following a complete sentence
+
+    Yields:
+        [(int, str)]: (Page index, Text of the block or break token)
+    """
+
+    yield ("", "")
+    previous = ""
+    for idx, (pageidx, line) in enumerate(lines):
         if idx == 0:
-            lines2.append((pageidx, line))
+            yield (pageidx, line)
 
-        if re.match(r"(\(\d+\))|(\d+\.)|\d+\)|([a-z]{0,1}+\.)", line) and re.match(r".+[\.:;](\s+((dan\/atau)|(atau)|(dan)))?$", lines[idx-1][1].strip()):
-            lines2.append((pageidx,break_token2))
+        if re.match(r"(\(\d+\))|(\d+\.)|\d+\)|([a-z]{0,1}+\.)", line) and re.match(r".+[\.:;](\s+((dan\/atau)|(atau)|(dan)))?$", previous.strip()):
+            yield (pageidx, BREAK_TOKEN2)
 
-        for pattern, token in break_token_patterns.items():
+        for pattern, token in BREAK_TOKEN_PATTERNS.items():
             if re.match(pattern, line):
-                lines2.append((pageidx,token))
-                
+                yield (pageidx, token)
+
         if re.match(r"^((Menimbang)|(Mengingat)|(MEMUTUSKAN))\s*:.*", line):
             found = re.search(r"^((Menimbang)|(Mengingat)|(MEMUTUSKAN))\s*:", line)
-            lines2.append((pageidx,break_token))
-            lines2.append((pageidx, line[:found.span()[1]].strip()))
-            lines2.append((pageidx,break_token))
-            lines2.append((pageidx, line[found.span()[1]:].strip()))  
+            yield (pageidx, BREAK_TOKEN)
+            yield (pageidx, line[:found.span()[1]].strip())
+            yield (pageidx, BREAK_TOKEN)
+            yield (pageidx, line[found.span()[1]:].strip())
         elif len(line)>0:
-            lines2.append((pageidx, line))
+            yield (pageidx, line)
         else:
-            lines2.append((pageidx, break_token))
+            yield (pageidx, BREAK_TOKEN)
 
         if re.match(r"^Pasal\s+\d+$", line):
-            lines2.append((pageidx, break_token))
-    
-    save_cp("\n".join([f"{x},{y}" for x, y in lines2]), path=filename, fn="raw2.txt")
-    final_text = []
-    for idx, (pageidx, line) in enumerate(lines2):
-        if line == break_token or line == break_token2:
+            yield (pageidx, BREAK_TOKEN)
+
+        previous = line
+
+def iter_blocks(tokens):
+    """ Join the text between break tokens into blocks; a block is yielded when the next one starts
+
+    Yields:
+        [str]: text block, items separated by new lines
+    """
+
+    block = None
+    previous = None
+    for _, line in tokens:
+        if line == BREAK_TOKEN or line == BREAK_TOKEN2:
+            previous = line
             continue
-        if idx==0:
-            final_text.append(line)
+        if block is None or previous == BREAK_TOKEN:
+            if block is not None:
+                yield block
+            block = line
+        elif previous == BREAK_TOKEN2:
+            block += "\n" + line
         else:
-            if lines2[idx-1][1] == break_token:
-                final_text.append(line)
-            elif lines2[idx-1][1] == break_token2:
-                final_text[-1] += "\n" + line
-            else:
-                final_text[-1] += " " + line
-                
-    save_cp("\n".join(final_text), path=filename, fn="final.txt")
-    return final_text
+            block += " " + line
+        previous = line
+
+    if block is not None:
+        yield block
+
+def write_cp(items, path, fn, to_text=str):
+    """ Pass items through, writing them to a debug file as they go """
+
+    with open(f"{cp_dir(path)}/{fn}",'w', encoding='utf-8') as f:
+        for item in items:
+            f.write(to_text(item) + "\n")
+            yield item
+
+def exctract_reg_text(filename, debug=False):
+    """ Text blocks of a regulation: headings, article texts and the blocks of the opening and closing.
+    Pages are read lazily and a block is yielded as soon as the next one starts, so only the current
+    page and block are in memory.
+
+    Args:
+        filename (str): PDF file
+        debug (bool, optional): write the intermediate stages to raw1.txt, raw2.txt and final.txt in a
+            folder named after the file, as they are processed. Defaults to False.
+
+    Yields:
+        [str]: text block, items separated by new lines
+    """
+
+    doc = fitz.open(filename)
+    try:
+        stages = iter_lines(doc)
+        if debug:
+            stages = write_cp(stages, filename, "raw1.txt", lambda x: f"{x[0]},{x[1]}")
+        stages = iter_tokens(stages)
+        if debug:
+            stages = write_cp(stages, filename, "raw2.txt", lambda x: f"{x[0]},{x[1]}")
+        stages = iter_blocks(stages)
+        if debug:
+            stages = write_cp(stages, filename, "final.txt")
+        yield from stages
+    finally:
+        doc.close()
 
 
 # In[893]:
@@ -166,164 +230,285 @@ def refine_heading(line, pattern):
     text = line[found.span()[1]:]
     return (ref, text)
 
-def to_html(data, output, title = ""):
-    doc = dominate.document(title=title)
-    
-    def get_heading_id(text):
-        return "-".join(ref.lower().split())
-
-    with doc.head:
-        style("""
-                html, h1, h2, h3, h4, h5, h6 {
-                     font-size: 13px;
-                     font-family: 'Segoe UI'
-                }
-
-                html {
-                    background-color: #796b6b;
-                }
-                
-                p {
-                    margin-block-start: 0.2em;
-                    margin-block-end: 0.2em;
-                }
-
-                h1, h2, h3, h4, h5, h6 {
-                    text-align: center;
-                    margin-block-start: 0.4em;
-                    margin-block-end: 0.4em;
-                }
-
-                .t0 {
-                    padding-left: 5px;
-                }
-
-                .t1 {
-                    padding-left: 10px;
-                }
-
-                .t2 {
-                    padding-left: 25px;
-                }
-
-                .t3 {
-                    padding-left: 35px;
-                }
-
-                .t4 {
-                    padding-left: 45px;
-                }
-
-                div.bl{
-                    width: 100%;
-                }
-
-                p {
-                    text-align: justify;
-                }
-
-                .container{
-                    background-color: white;
-                    width:80%; 
-                    max-width:1020px;
-                    padding:40px;
-                    margin: 0 auto;
-                }
-                
-                .fc {
-                    display: flex;
-                    align-content: space-around;
-                }
-                
-                .cnt {
-                    padding-left: 3px;
-                }
-               
-               
-                """)
-
-
-    with doc:
-        with div(_class="container"):
-            curr_BAB = "none"
+def iter_articles(blocks):
+    """ Iterate over the articles (Pasal) of the blocks of exctract_reg_text.
+    An article is yielded as soon as its text block is read, so blocks can be streamed
+    and a consumer can stop early.
+
+    Yields:
+        [(str, str, dict)]: (Pasal, Text, Enclosing headings, e.g. {'bab': 'BAB I', 'bagian': 'Bagian Kesatu'})
+    """
+
+    context = {}
+    pasal = None
+    for line in blocks:
+        if len(line) == 0:
+            continue
+        if pasal is not None:
+            yield (pasal, line, dict(context))
+            pasal = None
+        elif re.match(BAB_PATTERN+".+", line):
+            context = {'bab': refine_heading(line, BAB_PATTERN)[0]}
+        elif re.match(BAGIAN_PATTERN+".+", line):
+            context = {k: v for k, v in context.items() if k == 'bab'}
+            context['bagian'] = refine_heading(line, BAGIAN_PATTERN)[0]
+        elif re.match(PARAGRAPH_PATTERN+".+", line):
+            context['paragraf'] = refine_heading(line, PARAGRAPH_PATTERN)[0]
+        elif re.match(PASAL_PATTERN, line):
+            pasal = refine_heading(line, PASAL_PATTERN)[0]
+
+STYLESHEET = """
+html, h1, h2, h3, h4, h5, h6 {
+    font-size: 13px;
+    font-family: 'Segoe UI'
+}
+
+html {
+    background-color: #796b6b;
+}
+
+p {
+    margin-block-start: 0.2em;
+    margin-block-end: 0.2em;
+}
+
+h1, h2, h3, h4, h5, h6 {
+    text-align: center;
+    margin-block-start: 0.4em;
+    margin-block-end: 0.4em;
+}
+
+.t0 {
+    padding-left: 5px;
+}
+
+.t1 {
+    padding-left: 10px;
+}
+
+.t2 {
+    padding-left: 25px;
+}
+
+.t3 {
+    padding-left: 35px;
+}
+
+.t4 {
+    padding-left: 45px;
+}
+
+div.bl{
+    width: 100%;
+}
+
+p {
+    text-align: justify;
+}
+
+.container{
+    background-color: white;
+    width:80%;
+    max-width:1020px;
+    padding:40px;
+    margin: 0 auto;
+}
+
+.fc {
+    display: flex;
+    align-content: space-around;
+}
+
+.cnt {
+    padding-left: 3px;
+}
+"""
+
+BLOCK_TYPES = {"Menimbang": "menimbang", "Mengingat": "mengingat", "MEMUTUSKAN": "memutuskan"}
+
+def get_heading_id(ref):
+    return "-".join(ref.lower().split())
+
+def write_stylesheet(directory, name="style.css"):
+    """ Write the stylesheet shared by the rendered documents """
+
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+        f.write(STYLESHEET)
+    return name
+
+def iter_html(data, title="", stylesheet=None):
+    """ Render the blocks of exctract_reg_text as HTML, one block at a time.
+    Only the current headings and the previous block are kept, so blocks can be streamed
+    and memory does not grow with the length of the document.
+
+    Args:
+        data (iterable): text blocks, see exctract_reg_text
+        title (str, optional): document title
+        stylesheet (str, optional): URL of a shared stylesheet, see write_stylesheet. The styles are inlined when None.
+
+    Yields:
+        [str]: HTML fragments, to be written in order
+    """
+
+    head = f'<link rel="stylesheet" href="{html.escape(stylesheet)}">' if stylesheet else f"<style>{STYLESHEET}</style>"
+    yield f'<!DOCTYPE html>\n<html>\n<head>\n<title>{html.escape(title)}</title>\n{head}\n</head>\n<body>\n<div class="container">\n'
+
+    curr_BAB = "none"
+    curr_BAGIAN = "none"
+    curr_PARAGRAPH = "none"
+    curr_PASAL = "none"
+    previous = ""
+    for line in data:
+        if len(line) == 0:
+            # an empty block still counts as the previous one, as in the full document render
+            previous = line
+            continue
+        if re.match(BAB_PATTERN+".+", line):
+            ref, text = refine_heading(line, BAB_PATTERN)
+            curr_BAB = get_heading_id(ref)
             curr_BAGIAN = "none"
             curr_PARAGRAPH = "none"
-            curr_PASAL = "none"
-            for idx, line in enumerate(data):
-                if len(line) ==0:
-                    continue
-                if re.match(BAB_PATTERN+".+", line):
-                    ref, text = refine_heading(line, BAB_PATTERN)
-                    curr_BAB = get_heading_id(ref)
-                    curr_BAGIAN = "none"
-                    curr_PARAGRAPH = "none"
-                    with div(id=get_heading_id(ref),_class="bl hd").add(h3()):
-                        span(ref)
-                        br()
-                        span(text)
-                elif re.match(BAGIAN_PATTERN+".+", line):
-                    ref, text = refine_heading(line, BAGIAN_PATTERN)
-                    curr_BAGIAN = get_heading_id(ref) 
-                    curr_PARAGRAPH = "none"
-                    with div(id=get_heading_id(ref),_class="bl hd", bab=curr_BAB).add(h4()):
-                        span(ref)
-                        br()
-                        span(text)
-                elif re.match(PARAGRAPH_PATTERN+".+", line):
-                    ref, text = refine_heading(line, PARAGRAPH_PATTERN)
-                    curr_PARAGRAPH = get_heading_id(ref) 
-                    with div(id=get_heading_id(ref),_class="bl hd", bab=curr_BAB, bagian=curr_BAGIAN).add(h5()):
-                        span(ref)
-                        br()
-                        span(text)
-                elif re.match(PASAL_PATTERN, line):
-                    ref, text = refine_heading(line, PASAL_PATTERN)
-                    curr_PASAL = get_heading_id(ref)
-                    div(id=get_heading_id(ref),_class="bl hd", bab=curr_BAB, bagian=curr_BAGIAN, paragraf=curr_PARAGRAPH).add(h6(line))       
-                elif line.isupper() or re.match(r"^((Menimbang)|(Mengingat)|(MEMUTUSKAN))\s*:.*", line):
-                    div(_class="bl meta").add(h2(line))
+            block = div(id=curr_BAB, _class="bl hd")
+            with block.add(h3()):
+                span(ref)
+                br()
+                span(text)
+        elif re.match(BAGIAN_PATTERN+".+", line):
+            ref, text = refine_heading(line, BAGIAN_PATTERN)
+            curr_BAGIAN = get_heading_id(ref)
+            curr_PARAGRAPH = "none"
+            block = div(id=curr_BAGIAN, _class="bl hd", bab=curr_BAB)
+            with block.add(h4()):
+                span(ref)
+                br()
+                span(text)
+        elif re.match(PARAGRAPH_PATTERN+".+", line):
+            ref, text = refine_heading(line, PARAGRAPH_PATTERN)
+            curr_PARAGRAPH = get_heading_id(ref)
+            block = div(id=curr_PARAGRAPH, _class="bl hd", bab=curr_BAB, bagian=curr_BAGIAN)
+            with block.add(h5()):
+                span(ref)
+                br()
+                span(text)
+        elif re.match(PASAL_PATTERN, line):
+            ref, text = refine_heading(line, PASAL_PATTERN)
+            curr_PASAL = get_heading_id(ref)
+            block = div(id=curr_PASAL, _class="bl hd", bab=curr_BAB, bagian=curr_BAGIAN, paragraf=curr_PARAGRAPH)
+            block.add(h6(line))
+        elif line.isupper() or re.match(r"^((Menimbang)|(Mengingat)|(MEMUTUSKAN))\s*:.*", line):
+            block = div(_class="bl meta")
+            block.add(h2(line))
+        else:
+            # the items of an article or of the Menimbang, Mengingat and MEMUTUSKAN blocks are tagged with it
+            found = re.match(r"^(Menimbang|Mengingat|MEMUTUSKAN)\s*:", previous)
+            items = []
+            for lvl, ref, text in refine_pasal(line.split('\n')):
+                if re.match(PASAL_PATTERN, previous):
+                    item = div(_class=f"bl t{lvl} fc", id=ref, pasal=curr_PASAL)
+                elif found:
+                    item = div(_class=f"bl t{lvl} fc", id=ref, tipe=BLOCK_TYPES[found.group(1)])
                 else:
-                    refined = refine_pasal(line.split('\n'))
-                    if re.match(PASAL_PATTERN, data[idx-1]):
-                        for lvl, ref, text in refined:
-                            with div(_class=f"bl t{lvl} fc", id=ref, pasal=curr_PASAL):
-                                div(_class="pre").add(p(ref))
-                                div(_class="cnt").add(p(text))
-                                
-                    elif re.match("^Menimbang\s*:", data[idx-1]):
-                        for lvl, ref, text in refined:
-                            with div(_class=f"bl t{lvl} fc", id=ref, tipe="menimbang"):
-                                div(_class="pre").add(p(ref))
-                                div(_class="cnt").add(p(text))
-                                
-                    elif re.match("^Mengingat\s*:", data[idx-1]):
-                        for lvl, ref, text in refined:
-                            with div(_class=f"bl t{lvl} fc", id=ref, tipe="mengingat"):
-                                div(_class="pre").add(p(ref))
-                                div(_class="cnt").add(p(text))
-                                
-                    elif re.match("^MEMUTUSKAN\s*:", data[idx-1]):
-                        for lvl, ref, text in refined:
-                            with div(_class=f"bl t{lvl} fc", id=ref, tipe="memutuskan"):
-                                div(_class="pre").add(p(ref))
-                                div(_class="cnt").add(p(text))
-                                
-                    else:
-                        for lvl, ref, text in refined:
-                            with div(_class=f"bl t{lvl} fc"):
-                                div(_class="pre").add(p(ref))
-                                div(_class="cnt").add(p(text))          
+                    item = div(_class=f"bl t{lvl} fc")
+                with item:
+                    div(_class="pre").add(p(ref))
+                    div(_class="cnt").add(p(text))
+                items.append(item.render())
+            previous = line
+            yield "\n".join(items) + "\n"
+            continue
+
+        previous = line
+        yield block.render() + "\n"
+
+    yield "\n</div>\n</body>\n</html>\n"
+
+def to_html(data, output, title = "", stylesheet=None):
+    """ Write the blocks of exctract_reg_text as an HTML file, as they are rendered (see iter_html) """
 
     with open(output,'w', encoding='utf-8') as f:
-        f.write(doc.render())
+        for fragment in iter_html(data, title, stylesheet):
+            f.write(fragment)
+
+def html_name(filename, source):
+    """ Name of the HTML file of a regulation: the slug of its path relative to the source folder,
+    so regulations with the same filename in different subfolders do not overwrite each other
+    """
+
+    return slugify(re.sub(r"\.pdf$", "", os.path.relpath(filename, source), flags=re.IGNORECASE)) + ".html"
+
+def render_file(job, directory, stylesheet="style.css"):
+    """ Extract and render one regulation. Used as the worker function of the process pool.
+
+    Args:
+        job (tuple): (Filename, Output file relative to the directory), see html_name
+
+    Returns:
+        [(str, str, str)]: (Filename, Output file relative to the directory, Error or None)
+    """
+
+    filename, name = job
+    try:
+        to_html(exctract_reg_text(filename), os.path.join(directory, name), os.path.basename(filename), stylesheet)
+        return filename, name, None
+    except Exception as e:
+        return filename, name, f"{type(e).__name__}: {e}"
+
+def render_directory(source, directory, workers=None):
+    """ Render every PDF of a folder in parallel into a static site: one HTML file per regulation,
+    the shared stylesheet and an index page linking them. Files are named after their path in the
+    source folder (see html_name); a ValueError is raised before rendering if two names collide.
+
+    Args:
+        source (str): folder of the PDF files, searched recursively
+        directory (str): output folder, created if missing
+        workers (int, optional): number of worker processes. Defaults to all cores.
+
+    Returns:
+        [list]: (Filename, Error) of the regulations that could not be rendered
+    """
+
+    files = sorted(glob.glob(os.path.join(source, "**", "*.pdf"), recursive=True))
+    names = {}
+    for filename in files:
+        name = html_name(filename, source)
+        if name in names:
+            raise ValueError(f"{filename} and {names[name]} would both be rendered to {name}")
+        names[name] = filename
+
+    os.makedirs(directory, exist_ok=True)
+    stylesheet = write_stylesheet(directory)
+
+    rendered, errors = [], []
+    jobs = [(filename, name) for name, filename in names.items()]
+    with Pool(processes=workers) as pool:
+        for filename, name, error in pool.imap_unordered(partial(render_file, directory=directory, stylesheet=stylesheet), jobs):
+            if error:
+                errors.append((filename, error))
+            else:
+                rendered.append((os.path.relpath(filename, source), name))
+
+    index = dominate.document(title=os.path.basename(os.path.abspath(source)))
+    with index.head:
+        link(rel="stylesheet", href=stylesheet)
+    with index:
+        with div(_class="container"):
+            h1(index.title)
+            with ul():
+                for title, name in sorted(rendered):
+                    li(a(title, href=name))
+    with open(os.path.join(directory, "index.html"), 'w', encoding='utf-8') as f:
+        f.write(index.render())
+
+    return errors
 
 
 # In[894]:
 
 
-fn = "PERATURAN/PMK/Peraturan Menteri Keuangan Nomor  209~PMK.05~2020 Tahun 2020.pdf"
-data = exctract_reg_text(fn)
-to_html(data, "PMK 209~2020.html")
+if __name__ == "__main__":
+    fn = "PERATURAN/PMK/Peraturan Menteri Keuangan Nomor  209~PMK.05~2020 Tahun 2020.pdf"
+    data = exctract_reg_text(fn)
+    to_html(data, "PMK 209~2020.html")
 
 
 # In[ ]:
@@ -0,0 +1,244 @@
+""" Stage-level benchmark of RegParser over the bundled sample PDFs.
+
+    python benchmark.py                          # time every stage, write benchmark_results.json
+    python benchmark.py --compare baseline.json  # compare with a saved run
+    python benchmark.py --update-reference       # rewrite output/*.json from the current parser
+"""
+import argparse
+import functools
+import glob
+import inspect
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import fitz
+
+from inaregParser import PARSER_VERSION, RegParser
+
+SAMPLE_DIR = "sample"
+REFERENCE_DIR = "output"
+
+# pipeline stages run by load_pdf, in order
+PIPELINE = ['iter_pages', 'clean_text', 'split_heading_and_body', 'get_title', 'parse_body']
+
+# extraction stages, run after the pipeline on the parsed bill
+EXTRACTION = ['info', 'get_philosophical_consideration', 'get_legal_consideration', 'get_definitions',
+              'get_heading', 'get_articles', 'extract_all', 'get_further_provision', 'extract_currency',
+              'extract_percent', 'extract_withdraw_provision', 'get_words', 'get_phrashes']
+
+
+class StageRecorder:
+    """ Wraps parser methods to record the time and peak traced memory of each call """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        # [base, peak] of the stages being recorded; a nested stage resets the tracemalloc
+        # peak, so the peak seen so far is carried to the enclosing stages first
+        self.open = []
+
+    def _carry_peak(self):
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in self.open:
+            frame[1] = max(frame[1], peak)
+        return current
+
+    def record(self, name, func, *args, **kwargs):
+        if self.trace_memory:
+            current = self._carry_peak()
+            tracemalloc.reset_peak()
+            self.open.append([current, current])
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        if inspect.isgenerator(result):
+            result = list(result)
+        elapsed = time.perf_counter() - start
+
+        stage = self.stages.setdefault(name, {'time': 0.0})
+        stage['time'] += elapsed
+        if self.trace_memory:
+            self._carry_peak()
+            base, peak = self.open.pop()
+            stage['peak_memory'] = max(stage.get('peak_memory', 0), peak - base)
+
+        return result
+
+    def wrap(self, parser, name):
+        method = getattr(parser, name)
+        setattr(parser, name, functools.partial(self.record, name, method))
+
+
+def run_sample(file: str, trace_memory: bool = False):
+    """ Parse a sample once, timing every stage
+
+    Returns:
+        [(RegParser, dict)]: (Parsed bill, Stage measurements)
+    """
+
+    recorder = StageRecorder(trace_memory)
+    parser = RegParser('')
+    for name in PIPELINE:
+        recorder.wrap(parser, name)
+
+    recorder.record('load_pdf', parser.load_pdf, file, True, True)
+
+    # extractions are memoized and call each other (get_definitions runs get_articles, extract_all
+    # the extract_* methods), so each one is timed from an empty memo
+    for name in EXTRACTION:
+        parser._memo.clear()
+        recorder.record(name, getattr(parser, name))
+
+    sections = [(node.label, node.text_start, node.end) for node in parser.tree.segments]
+    for name in parser.extractors.names():
+        recorder.record(f"extractor:{name}", parser.extractors.scan, parser.body, sections, [name])
+
+    parser._memo.clear()
+    recorder.record('to_json', parser.to_json)
+
+    return parser, recorder.stages
+
+
+def normalize(result):
+    """ JSON round trip, so tuples and lists compare equal """
+
+    return json.loads(json.dumps(result))
+
+
+def check_reference(parser, name: str):
+    path = os.path.join(REFERENCE_DIR, f"{name}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return normalize(parser.to_json(return_dict=True)) == json.load(f)
+
+
+def benchmark(files, repeat: int = 3, trace_memory: bool = True):
+    """ Benchmark every sample. Times are the best of `repeat` runs; peak memory is
+    measured in a separate run with tracemalloc (memory allocated inside MuPDF is not traced).
+
+    Returns:
+        [dict]: results
+    """
+
+    samples = {}
+    for file in files:
+        name = os.path.splitext(os.path.basename(file))[0]
+        runs = [run_sample(file) for _ in range(repeat)]
+        parser = runs[0][0]
+        stages = {stage: {'time': min(stages[stage]['time'] for _, stages in runs)} for stage in runs[0][1]}
+
+        if trace_memory:
+            tracemalloc.start()
+            _, traced = run_sample(file, trace_memory=True)
+            tracemalloc.stop()
+            for stage, values in traced.items():
+                stages[stage]['peak_memory'] = values['peak_memory']
+
+        samples[name] = {
+            'file': file,
+            'pages': len(parser.pages),
+            'characters': len(parser.rawtext),
+            'sections': len(parser.parsed_text),
+            'articles': len(parser.get_articles()),
+            'reference_match': check_reference(parser, name),
+            'stages': stages,
+        }
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pymupdf': getattr(fitz, 'VersionBind', None),
+            'parser_version': PARSER_VERSION,
+            'repeat': repeat,
+        },
+        'samples': samples,
+    }
+
+
+def compare(results, baseline, tolerance: float = 0.1):
+    """ Compare stage times with a baseline run
+
+    Returns:
+        [list]: (Sample, Stage, Baseline time, Time, Ratio, Regression or not)
+    """
+
+    rows = []
+    for name, sample in results['samples'].items():
+        base = baseline.get('samples', {}).get(name)
+        if base is None:
+            continue
+        for stage, values in sample['stages'].items():
+            if stage not in base['stages']:
+                continue
+            before, after = base['stages'][stage]['time'], values['time']
+            ratio = after / before if before > 0 else float('inf')
+            rows.append((name, stage, before, after, ratio, ratio > 1 + tolerance))
+
+    return rows
+
+
+def update_reference(files):
+    os.makedirs(REFERENCE_DIR, exist_ok=True)
+    for file in files:
+        name = os.path.splitext(os.path.basename(file))[0]
+        with open(os.path.join(REFERENCE_DIR, f"{name}.json"), 'w', encoding='utf-8') as f:
+            f.write(RegParser(file, parse_now=True).to_json())
+        print(f"{name}: reference written", file=sys.stderr)
+
+
+def print_results(results):
+    for name, sample in results['samples'].items():
+        print(f"{name} ({sample['pages']} pages, {sample['sections']} sections, reference match: {sample['reference_match']})")
+        for stage, values in sample['stages'].items():
+            memory = f"{values['peak_memory'] / 1024:10.1f} KiB" if 'peak_memory' in values else ""
+            print(f"  {stage:40s} {values['time'] * 1000:10.2f} ms {memory}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark RegParser stages over the sample PDFs.")
+    ap.add_argument("files", nargs="*", help=f"PDF files (default: {SAMPLE_DIR}/*.pdf)")
+    ap.add_argument("-o", "--output", default="benchmark_results.json", help="results file (default: benchmark_results.json)")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="runs per sample, the best time is kept (default: 3)")
+    ap.add_argument("--no-memory", action="store_true", help="skip the peak memory run")
+    ap.add_argument("--compare", metavar="BASELINE", help="compare with a saved results file")
+    ap.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown ratio in compare mode (default: 0.1)")
+    ap.add_argument("--update-reference", action="store_true", help=f"rewrite {REFERENCE_DIR}/*.json from the current parser")
+    args = ap.parse_args(argv)
+
+    files = args.files or sorted(glob.glob(os.path.join(SAMPLE_DIR, "*.pdf")))
+    if args.update_reference:
+        update_reference(files)
+        return 0
+
+    results = benchmark(files, args.repeat, not args.no_memory)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+
+    status = 0
+    if any(sample['reference_match'] is False for sample in results['samples'].values()):
+        print("to_json output differs from the reference output", file=sys.stderr)
+        status = 1
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            rows = compare(results, json.load(f), args.tolerance)
+        print(f"\n{'sample':15s} {'stage':40s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+        for name, stage, before, after, ratio, regression in rows:
+            flag = "  <- slower" if regression else ""
+            print(f"{name:15s} {stage:40s} {before * 1000:8.2f}ms {after * 1000:8.2f}ms {ratio:7.2f}{flag}")
+        if any(row[-1] for row in rows):
+            status = 1
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,11 @@
-from inaregParser import UUParser
+from inaregParser import RegParser
 
-test_UU = UUParser('sample/uu10-2020bt.pdf')
+test_UU = RegParser('sample/uu10-2020bt.pdf', parse_now=True)
 
 
 print("Judul:", test_UU.title)
 print("\n")
-print("Info:", test_UU.info)
+print("Info:", test_UU.info())
 print("\n")
 print("Konsideran Menimbang:", test_UU.philosophical_consideration)
 print("\n")
@@ -19,10 +19,10 @@ print("Heading:", test_UU.heading)
 print("\n")
 print("Futher Provision:", test_UU.further_provision)
 print("\n")
-print("Currency:", test_UU.extract_currency())
+print("Currency:", test_UU.currency)
 print("\n")
-print("Percent:", test_UU.extract_percent())
+print("Percent:", test_UU.percent)
 print("\n")
-print("Withdraw:", test_UU.extract_withdraw_provision())
+print("Withdraw:", test_UU.withdraw_provision)
 
 
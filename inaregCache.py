@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+
+class BillCache:
+    """ Content-addressed on-disk cache for extracted and parsed bills.
+        Entries are keyed by the hash of the PDF bytes plus the parser version tag,
+        so a changed file or an upgraded parser never returns a stale entry.
+        Each parser version has its own subdirectory.
+        The least recently used entries are evicted when the cache grows beyond `max_size`.
+        The total size is scanned once and then kept up to date by put, so the entries are only
+        listed again when the cache is full. Processes sharing a cache each keep their own total,
+        so the cache can exceed `max_size` until one of them finds it full.
+    """
+
+    def __init__(self, directory: str, max_size: int = 1 << 30, version: str = None):
+        """
+        Args:
+            directory (str): cache directory, created if missing
+            max_size (int, optional): maximum total size in bytes. Defaults to 1 GiB.
+            version (str, optional): parser version tag. Defaults to inaregParser.PARSER_VERSION.
+        """
+
+        if version is None:
+            from inaregParser import PARSER_VERSION
+            version = PARSER_VERSION
+
+        self.directory = directory
+        self.max_size = max_size
+        self.version = str(version)
+        self._size = None
+        os.makedirs(os.path.join(directory, self.version), exist_ok=True)
+
+    def key(self, data: bytes):
+        """ Compute the cache key of a PDF
+
+        Args:
+            data (bytes): PDF content
+
+        Returns:
+            [str]: hex digest
+        """
+
+        h = hashlib.sha256(data)
+        h.update(b"\0" + self.version.encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, self.version, f"{key}.json")
+
+    def get(self, key: str):
+        """ Retrieve an entry and mark it as recently used
+
+        Returns:
+            [dict]: cached entry or None
+        """
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return entry
+
+    def put(self, key: str, entry: dict):
+        """ Store an entry, then evict old entries if the cache is full """
+
+        path = self._path(key)
+        if self._size is None:
+            self._size = self.size()
+        try:
+            self._size -= os.stat(path).st_size
+        except OSError:
+            pass
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+            self._size += f.tell()
+        os.replace(tmp, path)
+
+        if self._size > self.max_size:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        for version in os.listdir(self.directory):
+            folder = os.path.join(self.directory, version)
+            if not os.path.isdir(folder):
+                continue
+            for fn in os.listdir(folder):
+                if not fn.endswith('.json'):
+                    continue
+                path = os.path.join(folder, fn)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        return entries
+
+    def size(self):
+        """ Total size of the cache in bytes """
+
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_size: int = None):
+        """ Remove least recently used entries until the cache fits in `max_size`
+
+        Returns:
+            [int]: number of removed entries
+        """
+
+        max_size = self.max_size if max_size is None else max_size
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            removed += 1
+        self._size = total
+
+        return removed
+
+    def invalidate(self, all_versions: bool = False):
+        """ Remove entries written by other parser versions (or every entry)
+
+        Args:
+            all_versions (bool, optional): if True, clear the whole cache. Defaults to False.
+
+        Returns:
+            [int]: number of removed entries
+        """
+
+        removed = 0
+        for version in os.listdir(self.directory):
+            folder = os.path.join(self.directory, version)
+            if not os.path.isdir(folder) or (version == self.version and not all_versions):
+                continue
+            removed += sum(1 for fn in os.listdir(folder) if fn.endswith('.json'))
+            shutil.rmtree(folder, ignore_errors=True)
+
+        os.makedirs(os.path.join(self.directory, self.version), exist_ok=True)
+        self._size = None
+
+        return removed
@@ -0,0 +1,323 @@
+""" Consolidation of a bill with the bills amending it.
+
+    python inaregConsolidate.py base.pdf amendment-1.pdf amendment-2.pdf -o consolidated.txt
+    python inaregConsolidate.py base.pdf amendment-1.pdf --json
+"""
+import argparse
+import json
+import re
+import sys
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+from inaregParser import RegParser
+from inaregSegmenter import pasal_key
+
+# an article of the consolidated bill; headings are the full BAB, Bagian and Paragraf headings
+# enclosing it, source is the bill that last changed it (None for the base bill)
+Article = namedtuple("Article", ["label", "text", "headings", "source"])
+
+# a change made by an amending bill; action is 'replaced', 'inserted', 'deleted' or 'skipped'
+Change = namedtuple("Change", ["bill", "instruction", "action", "pasal"])
+
+HEADING_KINDS = ('bab', 'bagian', 'paragraf')
+DELETED = "Dihapus."
+
+# numbered instructions, several can be in one amendment segment ("4. Ketentuan Pasal 7 dihapus. 5. Di antara ...")
+INSTRUCTION = re.compile(r"(?:^|(?<=\s))\d+\.\s{0,3}(?=Judul|Ketentuan|Di\s+antara|Pasal\s)")
+PASAL = re.compile(r"Pasal\s+(\d+[A-Z]?)\b")
+AYAT = re.compile(r"\((\d+[a-z]?)\)(?=\s)")
+# articles and ayat named by an instruction ("Pasal 1 sampai dengan Pasal 3", "ayat (2) dan ayat (3)")
+PASAL_RANGE = re.compile(r"Pasal\s+(\d+[A-Z]?)\s+sampai\s+dengan\s+Pasal\s+(\d+[A-Z]?)\b")
+AYAT_REFERENCE = re.compile(r"ayat\s+\((\d+[a-z]?)\)(?:\s+sampai\s+dengan\s+ayat\s+\((\d+)\))?")
+# instructions changing the elucidation only ("Pasal 9 cukup jelas sebagaimana tercantum dalam penjelasan")
+ELUCIDATION = re.compile(r"dalam\s+penjelasan", re.IGNORECASE)
+
+
+def ayat_key(number: str):
+    """ Order of an ayat number, "2a" after "2" """
+
+    m = re.match(r"(\d+)([a-z]?)", number)
+    return int(m.group(1)), m.group(2)
+
+
+def split_ayat(text: str):
+    """ Split the text of an article into its ayat. Numbering starts at the ayat the text starts
+    with, so the ayat replaced by an amendment ("(2) ...") are split like a whole article.
+
+    Returns:
+        [(str, list)]: (Text before the first ayat, list of (Number, Text) of each ayat)
+    """
+
+    parts = []
+    first = AYAT.match(text)
+    expected = ayat_key(first.group(1))[0] if first else 1
+    for m in AYAT.finditer(text):
+        if m.start() > 0 and not (text[m.start() - 1].isspace() or text[m.start() - 1] in '"“'):
+            continue
+        number = m.group(1)
+        # ayat are numbered in order; inserted ones ("2a") follow the ayat they are inserted after
+        if ayat_key(number)[0] in (expected, expected - 1):
+            parts.append((m.start(), number))
+            expected = ayat_key(number)[0] + 1
+
+    if not parts:
+        return text, []
+    ayat = [(number, text[start:parts[i + 1][0] if i + 1 < len(parts) else len(text)].strip()) for i, (start, number) in enumerate(parts)]
+    return text[:parts[0][0]].strip(), ayat
+
+
+def clean_label(label: str):
+    return label.strip('"“” ')
+
+
+def clean_text(text: str):
+    return text.strip().strip('"“”').strip()
+
+
+class Consolidation:
+    """ The articles of a bill as amended. Articles are kept in a dictionary by number, with the
+        numbers in a sorted list, so every instruction is applied with a lookup and an inserted
+        article ("Pasal 5A") takes its place between the articles around it.
+    """
+
+    def __init__(self, base: RegParser):
+        """
+        Args:
+            base (RegParser): the bill being amended
+        """
+
+        self.title = base.title
+        self.articles = {}
+        self.changes = []
+        index = base.index
+        for key in index.keys:
+            node = index.pasal[key][0]   # the first one; the others are in the elucidation
+            headings = tuple(a.content for a in reversed(list(node.ancestors())) if a.kind in HEADING_KINDS)
+            self.articles[key] = Article(node.label, clean_text(node.text), headings, None)
+        self.keys = sorted(self.articles)
+
+    def get(self, ref):
+        """ Article by number, e.g. get("Pasal 5A") or get(5)
+
+        Returns:
+            [Article]: article, None if not found
+        """
+
+        return self.articles.get(pasal_key(ref))
+
+    def previous(self, key):
+        """ Article before a number, used for the headings of an inserted article """
+
+        i = bisect_left(self.keys, key)
+        return self.articles[self.keys[i - 1]] if i > 0 else None
+
+    def put(self, bill: str, instruction: str, label: str, text: str, headings=None):
+        """ Replace or insert an article """
+
+        key = pasal_key(label)
+        old = self.articles.get(key)
+        if old is None:
+            before = self.previous(key)
+            headings = headings or (before.headings if before else ())
+            insort(self.keys, key)
+            action = 'inserted'
+        else:
+            headings = headings or old.headings
+            action = 'replaced'
+        self.articles[key] = Article(label, text, headings, bill)
+        self.changes.append(Change(bill, instruction, action, label))
+
+    def put_ayat(self, bill: str, instruction: str, label: str, text: str):
+        """ Replace or insert ayat of an article ("Ketentuan ayat (2) Pasal 3 diubah ...") """
+
+        article = self.get(label)
+        if article is None:
+            self.changes.append(Change(bill, instruction, 'skipped', label))
+            return
+
+        _, new = split_ayat(text)
+        if not new:
+            self.changes.append(Change(bill, instruction, 'skipped', label))
+            return
+
+        head, ayat = split_ayat(article.text)
+        ayat = dict(ayat)
+        ayat.update(new)
+        text = ' '.join([head] + [ayat[number] for number in sorted(ayat, key=ayat_key)]).strip()
+        self.articles[pasal_key(label)] = article._replace(text=text, source=bill)
+        self.changes.append(Change(bill, instruction, 'replaced', label))
+
+    def targets(self, instruction: str):
+        """ Articles named by an instruction, ranges ("Pasal 1 sampai dengan Pasal 3") expanded
+        to the articles between them, inserted ones included
+
+        Returns:
+            [list]: labels, "Pasal 1", ...
+        """
+
+        labels = []
+        for m in PASAL_RANGE.finditer(instruction):
+            found = self.keys[bisect_left(self.keys, pasal_key(m.group(1))):bisect_right(self.keys, pasal_key(m.group(2)))]
+            labels.extend([self.articles[key].label for key in found] or [f"Pasal {m.group(1)}"])
+        labels.extend(f"Pasal {m.group(1)}" for m in PASAL.finditer(PASAL_RANGE.sub('', instruction)))
+        return labels
+
+    def delete(self, bill: str, instruction: str, label: str):
+        article = self.get(label)
+        if article is None:
+            self.changes.append(Change(bill, instruction, 'skipped', label))
+            return
+        self.articles[pasal_key(label)] = article._replace(text=DELETED, source=bill)
+        self.changes.append(Change(bill, instruction, 'deleted', article.label))
+
+    def apply(self, amendment: RegParser):
+        """ Apply the instructions of an amending bill. An instruction ending with "berbunyi sebagai
+        berikut" applies to the sections that follow it: each article replaces the article with
+        its number or is inserted, with the BAB, Bagian and Paragraf that precede it as headings;
+        ayat without an article replace the ayat of the article named by the instruction.
+        Instructions that cannot be applied are recorded as skipped.
+        """
+
+        bill = amendment.file
+        segments = amendment.tree.segments
+        active = False
+        i = 0
+        while i < len(segments):
+            node = segments[i]
+            i += 1
+            if node.kind == 'pasal_roman':
+                # "Pasal I Beberapa ketentuan ... diubah"; the closing Pasal II and the elucidation are not applied
+                active = re.search(r"diubah|dihapus|disisipkan", node.text) is not None
+                continue
+            if not active or node.kind != 'amendment':
+                continue
+
+            # sections following the instruction, up to the next instruction
+            content = []
+            while i < len(segments) and segments[i].kind not in ('amendment', 'pasal_roman'):
+                content.append(segments[i])
+                i += 1
+
+            text = node.content
+            starts = [m.start() for m in INSTRUCTION.finditer(text)] or [0]
+            instructions = [text[start:end].strip() for start, end in zip(starts, starts[1:] + [len(text)])]
+            for instruction in instructions[:-1]:
+                self.apply_instruction(bill, instruction, [])
+            self.apply_instruction(bill, instructions[-1], content)
+
+    def apply_instruction(self, bill: str, instruction: str, content):
+        if ELUCIDATION.search(instruction):
+            return
+
+        if re.search(r"dihapus\.?$", instruction):
+            labels = self.targets(instruction)
+            ayat = []
+            for m in AYAT_REFERENCE.finditer(instruction):
+                ayat.append(m.group(1))
+                if m.group(2):
+                    ayat.extend(str(n) for n in range(ayat_key(m.group(1))[0] + 1, int(m.group(2)) + 1))
+            if ayat and labels:
+                # "Ketentuan ayat (3) Pasal 2 dihapus": only the ayat are deleted
+                self.put_ayat(bill, instruction, labels[0], ' '.join(f"({n}) {DELETED}" for n in ayat))
+            elif labels:
+                for label in labels:
+                    self.delete(bill, instruction, label)
+            else:
+                self.changes.append(Change(bill, instruction, 'skipped', None))
+            return
+
+        articles = [node for node in content if node.kind == 'pasal']
+        if articles:
+            headings = {}
+            for node in content:
+                if node.kind in HEADING_KINDS:
+                    level = HEADING_KINDS.index(node.kind)
+                    headings = {k: v for k, v in headings.items() if k < level}
+                    headings[level] = node.content
+                elif node.kind == 'pasal':
+                    self.put(bill, instruction, clean_label(node.label), clean_text(node.text),
+                             tuple(headings[k] for k in sorted(headings)))
+            return
+
+        text = clean_text(' '.join(node.content for node in content))
+        target = PASAL.search(instruction)
+        if text and target and re.search(r"\bayat\b", instruction):
+            self.put_ayat(bill, instruction, f"Pasal {target.group(1)}", text)
+        else:
+            self.changes.append(Change(bill, instruction, 'skipped', target and f"Pasal {target.group(1)}"))
+
+    def __iter__(self):
+        """ Articles in order of number """
+
+        return (self.articles[key] for key in self.keys)
+
+    def text(self):
+        """ Consolidated text: the articles in order, each preceded by the headings that changed """
+
+        lines, current = [], ()
+        for article in self:
+            if article.headings != current:
+                common = 0
+                while common < min(len(current), len(article.headings)) and current[common] == article.headings[common]:
+                    common += 1
+                lines.extend(article.headings[common:])
+                current = article.headings
+            lines.append(article.label)
+            lines.append(article.text)
+
+        return "\n".join(lines)
+
+    def to_json(self):
+        return {
+            'title': self.title,
+            'articles': [article._asdict() for article in self],
+            'changes': [change._asdict() for change in self.changes],
+        }
+
+
+def consolidate(base: RegParser, amendments):
+    """ Apply amending bills to a bill, in order
+
+    Args:
+        base (RegParser): bill being amended
+        amendments (iterable): amending bills (RegParser), oldest first
+
+    Returns:
+        [Consolidation]: the articles of the amended bill
+    """
+
+    consolidation = Consolidation(base)
+    for amendment in amendments:
+        consolidation.apply(amendment)
+
+    return consolidation
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Consolidate an Indonesian bill with the bills amending it.")
+    ap.add_argument("base", help="PDF of the amended bill")
+    ap.add_argument("amendments", nargs="+", help="PDFs of the amending bills, oldest first")
+    ap.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (default)")
+    ap.add_argument("--json", action="store_true", help="write the articles and applied changes as JSON")
+    args = ap.parse_args(argv)
+
+    consolidation = consolidate(RegParser(args.base, parse_now=True),
+                                (RegParser(file, parse_now=True) for file in args.amendments))
+    result = json.dumps(consolidation.to_json(), ensure_ascii=False, indent=2) if args.json else consolidation.text()
+
+    if args.output == '-':
+        print(result)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(result)
+
+    skipped = [change for change in consolidation.changes if change.action == 'skipped']
+    for change in skipped:
+        print(f"{change.bill}: not applied: {change.instruction}", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from functools import partial
+from multiprocessing import Pool
+
+from inaregCache import BillCache
+from inaregParser import RegParser
+from inaregStats import StageTracker
+from inaregSupervisor import Supervisor
+
+
+def find_bills(source: str):
+    """ List bill PDFs from a directory or a glob pattern
+
+    Args:
+        source (str): directory (searched recursively) or glob pattern
+
+    Returns:
+        [list]: sorted list of PDF filenames
+    """
+
+    if os.path.isdir(source):
+        source = os.path.join(source, "**", "*.pdf")
+
+    return sorted(f for f in glob.glob(source, recursive=True) if f.lower().endswith('.pdf'))
+
+
+def parse_bill(file: str, cache: BillCache = None, on_start=None, on_stage=None, header_only: bool = False):
+    """ Run the whole parsing pipeline on a single bill.
+    Used as the worker function of the process pool, so it never raises: a failing bill
+    is reported as a record with an `error` key and the `stage` it failed in.
+
+    Args:
+        file (str): PDF filename
+        cache (BillCache, optional): cache of extracted and parsed bills. Defaults to None.
+        on_start (callable, optional): called with (bill, stage name) before each stage.
+        on_stage (callable, optional): called with the Stage measurement after each stage.
+        header_only (bool, optional): only parse the heading (title, info and considerations). Defaults to False.
+
+    Returns:
+        [(str, bool)]: (JSON line, Failed or not)
+    """
+
+    tracker = StageTracker(on_start, on_stage)
+    try:
+        parser = RegParser('', cache=cache)
+        parser.instrument(tracker, tracker.start)
+        parser.load_pdf(file, '.pdf' in file, parse_now=True, header_only=header_only)
+        result = parser.header_json() if header_only else parser.to_json(return_dict=True)
+        result['file'] = file
+        return json.dumps(result), False
+    except Exception as e:
+        return json.dumps({'file': file, 'error': f"{type(e).__name__}: {e}", 'stage': tracker.current}), True
+
+
+def iter_corpus(source, workers: int = None, chunksize: int = 1, cache: BillCache = None,
+                timeout: float = None, stage_timeout=None, retries: int = 1, header_only: bool = False):
+    """ Parse every bill of a corpus using a process pool.
+    Results are yielded as soon as a worker finishes, in completion order.
+    With a time budget, bills are run by a Supervisor instead, which kills a worker stuck
+    on a bill (e.g. a regex backtracking on malformed OCR text) and retries the bill.
+
+    Args:
+        source (str or list): directory, glob pattern or list of filenames
+        workers (int, optional): number of worker processes. Defaults to os.cpu_count().
+        chunksize (int, optional): number of bills sent to a worker at once. Defaults to 1.
+        cache (BillCache, optional): cache of extracted and parsed bills. Defaults to None.
+        timeout (float, optional): time budget of a bill in seconds. Defaults to None (no limit).
+        stage_timeout (float or dict, optional): time budget of a stage, or budgets by stage name. Defaults to None.
+        retries (int, optional): number of times a bill over budget is tried again. Defaults to 1.
+        header_only (bool, optional): only parse the heading of each bill. Defaults to False.
+
+    Yields:
+        [(str, bool)]: (JSON line, Failed or not) for every bill
+    """
+
+    files = find_bills(source) if isinstance(source, str) else list(source)
+    if not files:
+        return
+
+    if timeout is not None or stage_timeout is not None:
+        supervisor = Supervisor(partial(parse_bill, cache=cache, header_only=header_only), workers, timeout, stage_timeout, retries)
+        yield from supervisor.run(files)
+        return
+
+    with Pool(processes=workers) as pool:
+        yield from pool.imap_unordered(partial(parse_bill, cache=cache, header_only=header_only), files, chunksize=chunksize)
+
+
+def parse_corpus(source, output, workers: int = None, chunksize: int = 1, cache: BillCache = None,
+                 timeout: float = None, stage_timeout=None, retries: int = 1, header_only: bool = False):
+    """ Parse every bill of a corpus and write the results as JSON Lines.
+    Each line is written (and flushed) as soon as the bill is parsed, so results are
+    never held in memory.
+
+    Args:
+        source (str or list): directory, glob pattern or list of filenames
+        output (str or file): output filename or writable text file, '-' for stdout
+        workers (int, optional): number of worker processes. Defaults to os.cpu_count().
+        chunksize (int, optional): number of bills sent to a worker at once. Defaults to 1.
+        cache (BillCache, optional): cache of extracted and parsed bills. Defaults to None.
+        timeout, stage_timeout, retries: time budgets, see iter_corpus.
+        header_only (bool, optional): only parse the heading of each bill. Defaults to False.
+
+    Returns:
+        [(int, int)]: (Number of parsed bills, Number of failed bills)
+    """
+
+    if output == '-':
+        return parse_corpus(source, sys.stdout, workers, chunksize, cache, timeout, stage_timeout, retries, header_only)
+
+    if isinstance(output, str):
+        with open(output, 'w', encoding='utf-8') as f:
+            return parse_corpus(source, f, workers, chunksize, cache, timeout, stage_timeout, retries, header_only)
+
+    parsed, failed = 0, 0
+    for line, error in iter_corpus(source, workers, chunksize, cache, timeout, stage_timeout, retries, header_only):
+        output.write(line + "\n")
+        output.flush()
+        if error:
+            failed += 1
+        else:
+            parsed += 1
+
+    return parsed, failed
+
+
+def add_stage_timeout_argument(ap):
+    """ Add the --stage-timeout option to a command line parser, see stage_timeout_budgets """
+
+    ap.add_argument("--stage-timeout", action="append", default=[], metavar="[STAGE=]SECONDS",
+                    help="time budget of any stage, or of one stage (e.g. parse_body=10); can be repeated")
+
+
+def stage_timeout_budgets(ap, budgets):
+    """ Stage budgets of the --stage-timeout options
+
+    Returns:
+        [float or dict]: budget of any stage, budgets by stage name, or None
+    """
+
+    stage_timeout = None
+    for budget in budgets:
+        name, _, seconds = budget.rpartition('=')
+        if name and not isinstance(stage_timeout, float):
+            stage_timeout = stage_timeout or {}
+            stage_timeout[name] = float(seconds)
+        elif not name and stage_timeout is None:
+            stage_timeout = float(seconds)
+        else:
+            ap.error("--stage-timeout: a single budget for all stages cannot be combined with others")
+
+    return stage_timeout
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Parse a corpus of Indonesian bills into JSON Lines.")
+    ap.add_argument("source", help="directory or glob pattern of bill PDFs")
+    ap.add_argument("-o", "--output", default="-", help="output JSONL file, '-' for stdout (default)")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    ap.add_argument("--chunksize", type=int, default=1, help="number of bills sent to a worker at once")
+    ap.add_argument("--cache", default=None, help="directory of the extraction/parsing cache")
+    ap.add_argument("--cache-size", type=int, default=1024, help="maximum cache size in MiB (default: 1024)")
+    ap.add_argument("--timeout", type=float, default=None, help="time budget of a bill in seconds")
+    add_stage_timeout_argument(ap)
+    ap.add_argument("--retries", type=int, default=1, help="number of times a bill over budget is tried again (default: 1)")
+    ap.add_argument("--header-only", action="store_true", help="only parse title, info and considerations (fast)")
+    args = ap.parse_args(argv)
+
+    stage_timeout = stage_timeout_budgets(ap, args.stage_timeout)
+    cache = BillCache(args.cache, max_size=args.cache_size << 20) if args.cache else None
+    parsed, failed = parse_corpus(args.source, args.output, args.workers, args.chunksize, cache,
+                                  args.timeout, stage_timeout, args.retries, args.header_only)
+    print(f"{parsed} bills parsed, {failed} failed", file=sys.stderr)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
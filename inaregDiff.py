@@ -0,0 +1,212 @@
+""" Article-level comparison of two bills, e.g. a law and its amendment or two drafts.
+
+    python inaregDiff.py old.pdf new.pdf
+    python inaregDiff.py old.pdf new.pdf --json
+"""
+import argparse
+import json
+import sys
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from inaregParser import RegParser
+
+# a difference between two bills; old and new are article labels (None for an added or removed article),
+# changes are (Operation, Old words, New words) with operation 'replace', 'delete' or 'insert'
+ArticleDiff = namedtuple("ArticleDiff", ["status", "old", "new", "similarity", "changes"])
+
+ADDED, REMOVED, MODIFIED, RENUMBERED, UNCHANGED = 'added', 'removed', 'modified', 'renumbered', 'unchanged'
+
+
+def articles(bill):
+    """ Articles of a bill with whitespace normalized, so layout changes are not differences
+
+    Args:
+        bill (RegParser or list): parsed bill, or list of (Pasal, Text)
+
+    Returns:
+        [list]: (Pasal, Text) of each article, in document order
+    """
+
+    if isinstance(bill, RegParser):
+        bill = [(node.label, node.text) for node in bill.iter_articles()]
+    return [(label, ' '.join(text.split())) for label, text in bill]
+
+
+def similarity(old: str, new: str):
+    """ Similarity of two texts from 0 to 1, on their words """
+
+    return SequenceMatcher(None, old.split(), new.split(), autojunk=False).ratio()
+
+
+def word_changes(old: str, new: str):
+    """ Word-level changes between two texts
+
+    Returns:
+        [list]: (Operation, Old words, New words) of each change
+    """
+
+    a, b = old.split(), new.split()
+    return [(op, ' '.join(a[i1:i2]), ' '.join(b[j1:j2]))
+            for op, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes() if op != 'equal']
+
+
+def align(old, new, threshold: float = 0.5, window: int = 20):
+    """ Pair the articles of two bills. Identical articles are paired first, by number then by
+    content (renumbered articles); the other articles with the same number are paired when they
+    are similar enough; the remaining articles are paired by similarity. Texts are only compared
+    word by word for the articles left after the exact matches, and a remaining article is only
+    compared with the remaining old articles near its expected position, interpolated between
+    the old articles paired with its neighbours.
+
+    Args:
+        old, new (list): (Pasal, Text) of each article, see articles
+        threshold (float, optional): minimum similarity of paired articles that are not identical. Defaults to 0.5.
+        window (int, optional): maximum distance from the expected position of the compared old articles. Defaults to 20.
+
+    Returns:
+        [dict]: index of a new article -> (Index of the old article, Similarity)
+    """
+
+    pairs = {}
+    old_left, new_left = set(range(len(old))), set(range(len(new)))
+
+    def pair(i, j, score):
+        pairs[j] = (i, score)
+        old_left.discard(i)
+        new_left.discard(j)
+
+    def by(key, indices, items):
+        found = {}
+        for i in sorted(indices):
+            found.setdefault(key(items[i]), []).append(i)
+        return found
+
+    # same number and text, then same text
+    for key in (lambda item: item, lambda item: item[1]):
+        candidates = by(key, old_left, old)
+        for j in sorted(new_left):
+            if found := candidates.get(key(new[j])):
+                pair(found.pop(0), j, 1.0)
+
+    # same number, similar text
+    candidates = by(lambda item: item[0], old_left, old)
+    for j in sorted(new_left):
+        if found := candidates.get(new[j][0]):
+            score = similarity(old[found[0]][1], new[j][1])
+            if score >= threshold:
+                pair(found.pop(0), j, score)
+
+    # renumbered and modified: best remaining pairs first, among the old articles found around
+    # the position of the new article
+    if not old_left or not new_left:
+        return pairs
+    anchors = sorted(pairs)
+    remaining = sorted(old_left)
+    words = {i: old[i][1].split() for i in remaining}
+    scored = []
+    for j in new_left:
+        # expected position of the old article, interpolated between the neighbouring pairs
+        k = bisect_left(anchors, j)
+        j0, i0 = (anchors[k - 1], pairs[anchors[k - 1]][0]) if k > 0 else (-1, -1)
+        j1, i1 = (anchors[k], pairs[anchors[k]][0]) if k < len(anchors) else (len(new), len(old))
+        expected = i0 + (j - j0) * (i1 - i0) / (j1 - j0)
+        lo, hi = expected - window, expected + window
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(new[j][1].split())
+        for i in remaining[bisect_left(remaining, lo):bisect_right(remaining, hi)]:
+            matcher.set_seq1(words[i])
+            if matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold:
+                score = matcher.ratio()
+                if score >= threshold:
+                    scored.append((score, -j, -i))
+    for score, j, i in sorted(scored, reverse=True):
+        if -i in old_left and -j in new_left:
+            pair(-i, -j, score)
+
+    return pairs
+
+
+def diff_bills(old, new, threshold: float = 0.5, unchanged: bool = False):
+    """ Compare the articles of two bills
+
+    Args:
+        old, new (RegParser or list): parsed bills, or lists of (Pasal, Text)
+        threshold (float, optional): minimum similarity of an article and its modified version. Defaults to 0.5.
+        unchanged (bool, optional): also report unchanged articles. Defaults to False.
+
+    Returns:
+        [list(ArticleDiff)]: differences in the order of the new bill, removed articles after the
+            article that preceded them
+    """
+
+    old, new = articles(old), articles(new)
+    pairs = align(old, new, threshold)
+    matched = {i for i, _ in pairs.values()}
+
+    result = []
+    next_old = 0
+
+    def removed_before(end):
+        nonlocal next_old
+        for i in range(next_old, end):
+            if i not in matched:
+                result.append(ArticleDiff(REMOVED, old[i][0], None, 0.0, []))
+        next_old = max(next_old, end)
+
+    for j, (label, text) in enumerate(new):
+        if j not in pairs:
+            result.append(ArticleDiff(ADDED, None, label, 0.0, []))
+            continue
+
+        i, score = pairs[j]
+        removed_before(i)
+        before, after = old[i]
+        if after != text:
+            status = MODIFIED if before == label else RENUMBERED
+            result.append(ArticleDiff(status, before, label, score, word_changes(after, text)))
+        elif before != label:
+            result.append(ArticleDiff(RENUMBERED, before, label, 1.0, []))
+        elif unchanged:
+            result.append(ArticleDiff(UNCHANGED, before, label, 1.0, []))
+    removed_before(len(old))
+
+    return result
+
+
+def format_changes(changes):
+    """ Word-level changes as text, e.g. "[-tiga-]{+empat+}" """
+
+    parts = []
+    for op, before, after in changes:
+        if before:
+            parts.append(f"[-{before}-]")
+        if after:
+            parts.append(f"{{+{after}+}}")
+    return " ".join(parts)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare the articles of two Indonesian bills.")
+    ap.add_argument("old", help="PDF of the old bill or version")
+    ap.add_argument("new", help="PDF of the new bill or version")
+    ap.add_argument("--threshold", type=float, default=0.5, help="minimum similarity of a modified article (default: 0.5)")
+    ap.add_argument("--json", action="store_true", help="print the differences as JSON Lines")
+    args = ap.parse_args(argv)
+
+    differences = diff_bills(RegParser(args.old, parse_now=True), RegParser(args.new, parse_now=True), args.threshold)
+    for diff in differences:
+        if args.json:
+            print(json.dumps(diff._asdict(), ensure_ascii=False))
+        elif diff.status in (ADDED, REMOVED):
+            print(f"{diff.status:10s} {diff.new or diff.old}")
+        else:
+            label = diff.new if diff.old == diff.new else f"{diff.old} -> {diff.new}"
+            print(f"{diff.status:10s} {label} ({diff.similarity:.2f})  {format_changes(diff.changes)}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
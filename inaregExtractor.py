@@ -0,0 +1,119 @@
+import re
+from collections import namedtuple
+
+# a match of an extractor; start and end are offsets in the scanned text (the bill body)
+Extraction = namedtuple("Extraction", ["extractor", "section", "value", "start", "end"])
+
+
+class Extractor:
+    """ A named pattern extracted from every section of a bill """
+
+    def __init__(self, name: str, pattern, group=0, transform=None, trigger: str = None, flags: int = 0):
+        """
+        Args:
+            name (str): extractor name, key of the results
+            pattern (str or Pattern): regular expression
+            group (int or str, optional): group returned as value. Defaults to 0 (whole match).
+            transform (callable, optional): function of the match returning the value, overrides `group`.
+            trigger (str, optional): literal text required in a section before the pattern is run on it.
+            flags (int, optional): regular expression flags when `pattern` is a string.
+        """
+
+        self.name = name
+        self.pattern = re.compile(pattern, flags) if isinstance(pattern, str) else pattern
+        self.group = group
+        self.transform = transform
+        self.trigger = trigger
+
+    def value(self, match):
+        if self.transform is not None:
+            return self.transform(match)
+        return match.group(self.group)
+
+    def __repr__(self):
+        return f"Extractor({self.name!r}, {self.pattern.pattern!r})"
+
+
+class ExtractorRegistry:
+    """ Set of extractors run together over the sections of a bill.
+        Sections are visited once; every extractor is matched in place (with pos/endpos)
+        so no section text is copied, and a section without the trigger of an extractor is skipped.
+        Extractors are matched independently, so overlapping matches of different extractors are all reported.
+    """
+
+    def __init__(self, extractors=()):
+        self.extractors = {}
+        for extractor in extractors:
+            self.add(extractor)
+
+    def add(self, extractor: Extractor):
+        self.extractors[extractor.name] = extractor
+        return extractor
+
+    def register(self, name: str, pattern, group=0, transform=None, trigger: str = None, flags: int = 0):
+        """ Create and register an extractor, see Extractor for the arguments """
+
+        return self.add(Extractor(name, pattern, group, transform, trigger, flags))
+
+    def unregister(self, name: str):
+        self.extractors.pop(name, None)
+
+    def copy(self):
+        return ExtractorRegistry(self.extractors.values())
+
+    def names(self):
+        return list(self.extractors)
+
+    def __contains__(self, name):
+        return name in self.extractors
+
+    def scan(self, text: str, sections, names=None):
+        """ Run the extractors over the sections of a text
+
+        Args:
+            text (str): text containing the sections
+            sections (iterable): (Section Id, Start, End) of each section in `text`
+            names (list, optional): only run these extractors. Defaults to all.
+
+        Returns:
+            [dict]: extractor name -> list of Extraction, in document order
+        """
+
+        extractors = [self.extractors[n] for n in names] if names is not None else list(self.extractors.values())
+        results = {extractor.name: [] for extractor in extractors}
+
+        for section, start, end in sections:
+            for extractor in extractors:
+                if extractor.trigger is not None and text.find(extractor.trigger, start, end) == -1:
+                    continue
+                found = results[extractor.name]
+                for m in extractor.pattern.finditer(text, start, end):
+                    found.append(Extraction(extractor.name, section, extractor.value(m), m.start(), m.end()))
+
+        return results
+
+
+def _withdraw_provision(match):
+    return match.group(1).strip(', :')
+
+
+def _further_provision(match):
+    return (match.group(2).strip().split("sebagaimana dimaksud")[0], (match.group(6) or '').strip())
+
+
+def default_registry():
+    """ Registry of the built-in extractors
+
+    Returns:
+        [ExtractorRegistry]: currency_rp, currency_usd, percent, withdraw_provision and further_provision
+    """
+
+    return ExtractorRegistry([
+        Extractor("currency_rp", r"(Rp)([+-]?[0-9]{1,3}(\.?[0-9]{3})*)(,[0-9]{1,4})", trigger="Rp"),
+        Extractor("currency_usd", r"(USD)([+-]?[0-9]{1,3}(,?[0-9]{3})*)(\.[0-9]{1,4})", trigger="USD"),
+        Extractor("percent", r"([+-]?[0-9]{1,3}(\.?[0-9]{3})*)%", trigger="%"),
+        Extractor("withdraw_provision", r"Pada saat Undang-Undang ini mulai berlaku(.*)dicabut dan dinyatakan",
+                  transform=_withdraw_provision, trigger="dicabut dan dinyatakan"),
+        Extractor("further_provision", r"(Ketentuan lebih lanjut mengenai)(.*)((dituangkan dalam)|(diatur dengan)(.*))",
+                  transform=_further_provision, trigger="Ketentuan lebih lanjut mengenai"),
+    ])
@@ -0,0 +1,489 @@
+""" Resumable batch ingestion of bills.
+
+    python inaregJobs.py add jobs.db sample/                  # register the bills of a folder
+    python inaregJobs.py run jobs.db -o output/jobs -j 8      # parse pending bills, several runs can share a manifest
+    python inaregJobs.py status jobs.db
+    python inaregJobs.py retry jobs.db                        # make failed bills pending again
+
+    python inaregJobs.py add /shared/jobs/ /shared/bills/     # a directory manifest can be shared between machines
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import tempfile
+import time
+from functools import partial
+from itertools import chain
+
+from inaregCache import BillCache
+from inaregCorpus import add_stage_timeout_argument, find_bills, parse_bill, stage_timeout_budgets
+from inaregSupervisor import Supervisor
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+
+class Manifest:
+    """ Status of every bill of a batch job, kept in a SQLite database.
+        Workers claim bills in a transaction, so several processes on the same host never get the
+        same bill. SQLite locking is not reliable on network filesystems (NFS, SMB); use a
+        SharedManifest for runs on several machines. A claim is a lease: bills claimed by a worker
+        that crashed become available again once the lease has expired.
+    """
+
+    def __init__(self, path: str, lease: float = 3600):
+        """
+        Args:
+            path (str): database file, created if needed
+            lease (float, optional): seconds after which a claimed bill that is not finished
+                can be claimed by another worker. Defaults to 3600.
+        """
+
+        self.path = path
+        self.lease = lease
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS bills (
+            file TEXT PRIMARY KEY, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT, claimed_at REAL, finished_at REAL, error TEXT, stage TEXT, output TEXT)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS bills_status ON bills (status)")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, files):
+        """ Register bills as pending; bills already in the manifest are left as they are
+
+        Returns:
+            [int]: number of bills added
+        """
+
+        before = self.db.total_changes
+        self.db.execute("BEGIN IMMEDIATE")
+        self.db.executemany("INSERT OR IGNORE INTO bills (file, status) VALUES (?, ?)", ((f, PENDING) for f in files))
+        self.db.execute("COMMIT")
+
+        return self.db.total_changes - before
+
+    def claim(self, worker: str, n: int = 1):
+        """ Claim pending bills, and bills whose lease has expired
+
+        Returns:
+            [list]: claimed filenames, empty when nothing is left
+        """
+
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            files = [row[0] for row in self.db.execute(
+                "SELECT file FROM bills WHERE status = ? OR (status = ? AND claimed_at < ?) ORDER BY rowid LIMIT ?",
+                (PENDING, RUNNING, now - self.lease, n))]
+            self.db.executemany("UPDATE bills SET status = ?, worker = ?, claimed_at = ?, attempts = attempts + 1 WHERE file = ?",
+                                ((RUNNING, worker, now, f) for f in files))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+        return files
+
+    def finish(self, file: str, worker: str, output: str = None, error: str = None, stage: str = None):
+        """ Record the result of a bill and renew the lease of the other bills claimed by the worker """
+
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        self.db.execute("UPDATE bills SET status = ?, finished_at = ?, output = ?, error = ?, stage = ? WHERE file = ?",
+                        (FAILED if error else DONE, now, output, error, stage, file))
+        self.db.execute("UPDATE bills SET claimed_at = ? WHERE worker = ? AND status = ?", (now, worker, RUNNING))
+        self.db.execute("COMMIT")
+
+    def release(self, worker: str):
+        """ Make the unfinished bills of a worker pending again """
+
+        self.db.execute("UPDATE bills SET status = ?, attempts = attempts - 1 WHERE worker = ? AND status = ?",
+                        (PENDING, worker, RUNNING))
+
+    def retry(self, status: str = FAILED):
+        """ Make bills with the given status pending again
+
+        Returns:
+            [int]: number of bills
+        """
+
+        return self.db.execute("UPDATE bills SET status = ?, error = NULL, stage = NULL WHERE status = ?",
+                               (PENDING, status)).rowcount
+
+    def counts(self):
+        """ Number of bills by status """
+
+        counts = dict.fromkeys([PENDING, RUNNING, DONE, FAILED], 0)
+        counts.update(self.db.execute("SELECT status, COUNT(*) FROM bills GROUP BY status"))
+        return counts
+
+    def files(self, status: str = None):
+        """ Bills of the manifest
+
+        Returns:
+            [list]: (File, Status, Attempts, Error, Stage) of each bill
+        """
+
+        query = "SELECT file, status, attempts, error, stage FROM bills"
+        if status is None:
+            return self.db.execute(query + " ORDER BY rowid").fetchall()
+        return self.db.execute(query + " WHERE status = ? ORDER BY rowid", (status,)).fetchall()
+
+
+class SharedManifest:
+    """ Status of every bill of a batch job, kept as files in a directory, for runs on several
+        machines sharing a network filesystem. Only operations that are atomic on NFS are used:
+        - bills/<id> holds the filename of a registered bill;
+        - leases/<id> is the claim of a bill, created with O_EXCL so only one worker gets it. Its
+          modification time is the time of the claim, renewed while the worker makes progress;
+          an expired lease is taken over by renaming it first, so only one worker can take it;
+        - results/<id>.json is the status of a finished bill, written to a temporary file and renamed.
+        The id of a bill is the SHA-1 of its filename. Same interface as Manifest.
+    """
+
+    def __init__(self, path: str, lease: float = 3600):
+        """
+        Args:
+            path (str): manifest directory, created if needed
+            lease (float, optional): seconds after which a claimed bill that is not finished
+                can be claimed by another worker. Defaults to 3600.
+        """
+
+        self.path = path
+        self.lease = lease
+        for name in ('bills', 'leases', 'results'):
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+        self.held = {}          # id -> attempt, bills claimed by this process and not finished
+        self._bills = None
+        self._cursor = 0
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def bill_id(file: str):
+        return hashlib.sha1(file.encode('utf-8')).hexdigest()
+
+    def _file(self, *parts):
+        return os.path.join(self.path, *parts)
+
+    def _write(self, path: str, text: str):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def bills(self):
+        """ Registered bills, read once
+
+        Returns:
+            [dict]: id -> filename, in order of filename
+        """
+
+        if self._bills is None:
+            bills = {}
+            for id in os.listdir(self._file('bills')):
+                if not id.endswith('.tmp'):
+                    with open(self._file('bills', id), 'r', encoding='utf-8') as f:
+                        bills[id] = f.read()
+            self._bills = dict(sorted(bills.items(), key=lambda item: item[1]))
+        return self._bills
+
+    def add(self, files):
+        """ Register bills as pending; bills already in the manifest are left as they are
+
+        Returns:
+            [int]: number of bills added
+        """
+
+        added = 0
+        for file in files:
+            path = self._file('bills', self.bill_id(file))
+            if not os.path.exists(path):
+                self._write(path, file)
+                added += 1
+        self._bills = None
+
+        return added
+
+    def _acquire(self, id: str, worker: str):
+        """ Create the lease of a bill, taking over an expired one
+
+        Returns:
+            [int]: attempt number, None if the bill is claimed by another worker
+        """
+
+        path = self._file('leases', id)
+        attempt = 1
+        try:
+            if time.time() - os.stat(path).st_mtime < self.lease:
+                return None
+            # only one worker can rename the expired lease away
+            stale = f"{path}.{worker}.stale"
+            os.rename(path, stale)
+            with open(stale, 'r', encoding='utf-8') as f:
+                attempt = int(f.read().split()[-1]) + 1
+            if time.time() - os.stat(stale).st_mtime < self.lease:
+                # renewed or claimed again in the meantime: give it back
+                try:
+                    os.link(stale, path)
+                except FileExistsError:
+                    pass
+                os.remove(stale)
+                return None
+            os.remove(stale)
+        except (FileNotFoundError, ValueError, IndexError):
+            pass
+
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(f"{worker} {attempt}")
+        return attempt
+
+    def claim(self, worker: str, n: int = 1):
+        """ Claim pending bills, and bills whose lease has expired. The bills are scanned from where
+        the previous claim stopped, wrapping around once, so a claim usually checks a few bills.
+
+        Returns:
+            [list]: claimed filenames, empty when nothing is left
+        """
+
+        bills = list(self.bills().items())
+        files = []
+        for i in chain(range(self._cursor, len(bills)), range(0, min(self._cursor, len(bills)))):
+            id, file = bills[i]
+            if id in self.held or os.path.exists(self._file('results', f"{id}.json")):
+                continue
+            attempt = self._acquire(id, worker)
+            if attempt is not None:
+                self.held[id] = attempt
+                files.append(file)
+                if len(files) >= n:
+                    self._cursor = i + 1
+                    break
+
+        return files
+
+    def finish(self, file: str, worker: str, output: str = None, error: str = None, stage: str = None):
+        """ Record the result of a bill and renew the lease of the other bills claimed by the worker """
+
+        id = self.bill_id(file)
+        result = {'file': file, 'status': FAILED if error else DONE, 'attempts': self.held.pop(id, 1),
+                  'worker': worker, 'finished_at': time.time(), 'output': output, 'error': error, 'stage': stage}
+        self._write(self._file('results', f"{id}.json"), json.dumps(result, ensure_ascii=False))
+        try:
+            os.remove(self._file('leases', id))
+        except FileNotFoundError:
+            pass
+        for other in self.held:
+            try:
+                os.utime(self._file('leases', other))
+            except FileNotFoundError:
+                pass
+
+    def release(self, worker: str):
+        """ Make the unfinished bills of this worker pending again """
+
+        for id in self.held:
+            try:
+                os.remove(self._file('leases', id))
+            except FileNotFoundError:
+                pass
+        self.held = {}
+
+    def _read_results(self):
+        for name in os.listdir(self._file('results')):
+            if name.endswith('.json'):
+                try:
+                    with open(self._file('results', name), 'r', encoding='utf-8') as f:
+                        yield name[:-5], json.load(f)
+                except (OSError, ValueError):
+                    continue
+
+    def retry(self, status: str = FAILED):
+        """ Make bills with the given status pending again
+
+        Returns:
+            [int]: number of bills
+        """
+
+        retried = 0
+        for id, result in self._read_results():
+            if result['status'] == status:
+                os.remove(self._file('results', f"{id}.json"))
+                retried += 1
+        return retried
+
+    def files(self, status: str = None):
+        """ Bills of the manifest
+
+        Returns:
+            [list]: (File, Status, Attempts, Error, Stage) of each bill
+        """
+
+        results = dict(self._read_results())
+        now = time.time()
+        rows = []
+        for id, file in self.bills().items():
+            if id in results:
+                result = results[id]
+                row = (file, result['status'], result['attempts'], result['error'], result['stage'])
+            else:
+                try:
+                    running = now - os.stat(self._file('leases', id)).st_mtime < self.lease
+                except FileNotFoundError:
+                    running = False
+                row = (file, RUNNING if running else PENDING, 0, None, None)
+            if status is None or row[1] == status:
+                rows.append(row)
+        return rows
+
+    def counts(self):
+        """ Number of bills by status """
+
+        counts = dict.fromkeys([PENDING, RUNNING, DONE, FAILED], 0)
+        for row in self.files():
+            counts[row[1]] += 1
+        return counts
+
+
+def open_manifest(path: str, lease: float = 3600):
+    """ Manifest of a job: a SharedManifest for a directory (existing, or a path ending with a
+    separator), a SQLite Manifest otherwise """
+
+    if os.path.isdir(path) or path.endswith(('/', os.sep)):
+        return SharedManifest(path, lease)
+    return Manifest(path, lease)
+
+
+def claimed(manifest, worker: str, batch: int = 1):
+    """ Bills claimed from a manifest as they are needed, `batch` at a time
+
+    Yields:
+        [str]: filenames
+    """
+
+    while files := manifest.claim(worker, batch):
+        yield from files
+
+
+def worker_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_job(manifest, output_dir: str, workers: int = None, batch: int = 1, cache: BillCache = None,
+            timeout: float = None, stage_timeout=None, retries: int = 1):
+    """ Parse the pending bills of a manifest until none are left.
+    The bills are run by one Supervisor for the whole job, and a bill is claimed when a worker
+    process becomes free, so no worker waits for the slowest bill of a batch. Each result is
+    appended to the JSON Lines file of this run in `output_dir` and flushed before the bill is
+    marked as done, so after a crash only unfinished bills are parsed again. A bill can appear
+    twice in the output when the crash happens between the two; readers should keep the last line of each file.
+
+    Args:
+        manifest (Manifest or SharedManifest): job manifest, see open_manifest
+        output_dir (str): directory of the output files, one per run
+        workers (int, optional): number of worker processes. Defaults to os.cpu_count().
+        batch (int, optional): number of bills claimed at once. Defaults to 1.
+        cache, timeout, stage_timeout, retries: see inaregCorpus.iter_corpus.
+
+    Returns:
+        [(int, int)]: (Number of parsed bills, Number of failed bills)
+    """
+
+    name = worker_name()
+    os.makedirs(output_dir, exist_ok=True)
+    output = os.path.join(output_dir, f"{name}.jsonl")
+    supervisor = Supervisor(partial(parse_bill, cache=cache), workers, timeout, stage_timeout, retries)
+
+    parsed, failed = 0, 0
+    try:
+        with open(output, 'a', encoding='utf-8') as f:
+            for line, error in supervisor.run(claimed(manifest, name, batch)):
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+                result = json.loads(line)
+                manifest.finish(result['file'], name, output, result.get('error'), result.get('stage'))
+                if error:
+                    failed += 1
+                else:
+                    parsed += 1
+    finally:
+        manifest.release(name)
+
+    return parsed, failed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Resumable batch parsing of Indonesian bills.")
+    commands = ap.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="register bills in the manifest")
+    add.add_argument("manifest", help="SQLite manifest file, or directory of a manifest shared between machines")
+    add.add_argument("source", nargs="+", help="directories, glob patterns or PDF files")
+
+    run = commands.add_parser("run", help="parse the pending bills")
+    run.add_argument("manifest", help="SQLite manifest file, or directory of a manifest shared between machines")
+    run.add_argument("-o", "--output", required=True, help="output directory, one JSONL file per worker")
+    run.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    run.add_argument("--batch", type=int, default=1, help="number of bills claimed at once, as workers become free (default: 1)")
+    run.add_argument("--lease", type=float, default=3600, help="seconds before bills of a lost worker are claimed again (default: 3600)")
+    run.add_argument("--cache", default=None, help="directory of the extraction/parsing cache")
+    run.add_argument("--cache-size", type=int, default=1024, help="maximum cache size in MiB (default: 1024)")
+    run.add_argument("--timeout", type=float, default=None, help="time budget of a bill in seconds")
+    add_stage_timeout_argument(run)
+    run.add_argument("--retries", type=int, default=1, help="number of times a bill over budget is tried again (default: 1)")
+
+    status = commands.add_parser("status", help="show the progress of the job")
+    status.add_argument("manifest", help="SQLite manifest file, or directory of a manifest shared between machines")
+    status.add_argument("--failed", action="store_true", help="list the failed bills")
+
+    retry = commands.add_parser("retry", help="make failed bills pending again")
+    retry.add_argument("manifest", help="SQLite manifest file, or directory of a manifest shared between machines")
+
+    args = ap.parse_args(argv)
+
+    with open_manifest(args.manifest, getattr(args, 'lease', 3600)) as manifest:
+        if args.command == "add":
+            files = [f for source in args.source for f in (find_bills(source) if not os.path.isfile(source) else [source])]
+            print(f"{manifest.add(files)} bills added", file=sys.stderr)
+        elif args.command == "run":
+            cache = BillCache(args.cache, max_size=args.cache_size << 20) if args.cache else None
+            parsed, failed = run_job(manifest, args.output, args.workers, args.batch, cache,
+                                     args.timeout, stage_timeout_budgets(run, args.stage_timeout), args.retries)
+            print(f"{parsed} bills parsed, {failed} failed", file=sys.stderr)
+        elif args.command == "status":
+            print(json.dumps(manifest.counts()))
+            if args.failed:
+                for file, _, attempts, error, stage in manifest.files(FAILED):
+                    print(f"{file}\t{stage}\t{error}\t{attempts}")
+        elif args.command == "retry":
+            print(f"{manifest.retry()} bills pending again", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,50 +1,478 @@
 from os import walk
+import functools
+import hashlib
+import os
+from collections import namedtuple
+from itertools import chain
 import json
 import re
 from pdfminer.high_level import extract_text
 import fitz
+from inaregExtractor import default_registry
+from inaregPhrases import PhraseMiner
+from inaregSegmenter import DocumentTree, Segmenter
+from inaregStats import timed
+from inaregWords import most_frequent, word_counts
+
+# bump whenever a change alters the parser output, so cached results are not reused
+PARSER_VERSION = "2"
+
+# result of RegParser.update: page numbers (0-based) and sections of the new version
+Changes = namedtuple("Changes", ["extracted_pages", "changed_pages", "added", "removed", "changed"])
+
+def open_pdf(source):
+    """ Open a PDF from a filename or from its content (bytes) """
+
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+def extract_pages_text(source, start: int, stop: int, step: int = 1):
+    """ Extract the text of pages [start, stop) using its own document handle,
+    so it can run concurrently in an executor.
+
+    Returns:
+        [list]: text of each page
+    """
+
+    with open_pdf(source) as reader:
+        return [reader[i].get_text() for i in range(start, stop, step)]
+
+def page_fingerprint(reader, page):
+    """ Hash of what the text of a page is extracted from: its content stream, the streams of
+    its form XObjects and its fonts (without their object numbers, which change when a PDF is
+    written again), so unchanged pages of a republished PDF need not be extracted again.
+
+    Returns:
+        [str]: hex digest
+    """
+
+    h = hashlib.sha1(page.read_contents())
+    for xobject in page.get_xobjects():
+        h.update(reader.xref_stream(xobject[0]) or b'')
+    for font in page.get_fonts():
+        h.update(repr(font[1:]).encode())
+    return h.hexdigest()
+
+def page_fingerprints(source):
+    """ Fingerprint of every page of a PDF, see page_fingerprint
+
+    Returns:
+        [list]: hex digest of each page
+    """
+
+    with open_pdf(source) as reader:
+        return [page_fingerprint(reader, page) for page in reader]
+
+# end of the heading, see RegParser.split_heading_and_body
+HEADING_END = re.compile(r"(Menetapkan|MEMUTUSKAN)\s*:[^\.]*\.")
+ENACTING_CLAUSE = re.compile(r"Menetapkan\s*:[^\.]*\.*?")
+DECISION_CLAUSE = re.compile(r"MEMUTUSKAN\s*:[^\.]*\.*?")
+
+CONNECTION_MARKER = re.compile(r"(\s?\.\.\.\s)")
+NEXT_TWO_WORDS = re.compile(r"\s*(\S+)\s+(\S+)")
+
+NUMBER_YEAR = re.compile(r"NOMOR\s+(\d+)\s+TAHUN\s+(\d{4})\s+TENTANG", re.MULTILINE|re.IGNORECASE)
+SIGNED_DATE = re.compile(r"[dD]isahkan\s+di\s+(.+)\spada\s+tanggal\s+(\d+\s\w+\s\d{4})", re.MULTILINE|re.IGNORECASE)
+ENACTMENT_DATE = re.compile(r"diundangkan\s+di\s+(.+)\spada\stanggal\s(\d+\s\w+\s\d{4})", re.MULTILINE|re.IGNORECASE)
+EFFECTIVE_DATE = re.compile(r"\s+ini\s+mulai\s+berlaku\s+pada\s+tanggal\s+(\d+\s\w+\s\d{4})", re.MULTILINE|re.IGNORECASE)
+TITLE = re.compile(r"MENETAPKAN\s?:.+?\.", re.MULTILINE|re.IGNORECASE)
+LEGAL_CONSIDERATION = re.compile(r"(\d+\.\s+(Undang|Peraturan|Keputusan|TAP|Pasal).+?\;)", re.MULTILINE|re.IGNORECASE)
+PHILOSOPHICAL_CONSIDERATION = re.compile(r"[a-z]\.\sbahwa.+?\;", re.MULTILINE|re.IGNORECASE)
+DEFINITION_TERM = re.compile(r"^(.+)( adalah )", re.IGNORECASE)
+DEFINITION_ALIAS = re.compile(r"(disingkat|(disebut)|disingkat,|disebut,)(.+)", re.IGNORECASE)
+
+def word_start(text: str, end: int, n: int):
+    """ Start of the n-th word before `end`, 0 if there are fewer words """
+
+    i = end
+    for _ in range(n):
+        while i > 0 and text[i - 1].isspace():
+            i -= 1
+        while i > 0 and not text[i - 1].isspace():
+            i -= 1
+    return i
+
+def normalize_characters(text: str):
+    """ Remove unknown characters and normalize ellipses """
+
+    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\xff]', '', text)      
+    text = re.sub('\s+(\.\s+){3}','...', text)
+    text = re.sub('\s+…','...', text)
+    return re.sub('\s+\.\.\.[^[\.]]','...', text)
+
+def is_noise_line(t: str):
+    """ Whether a line is a common unnecessary part (page header, page number, gazette number, ...) """
+
+    if "PRESIDEN" in t.strip():
+       return True
+    if "REPUBLIK INDONESIA" in t.strip():
+       return True
+    if re.match("SK\s+No\s+\d+.+?A", t):
+       return True
+    if re.match("\w\.{3}$", t.strip()):
+       return True
+    if re.match("^www.+\.go\.id", t.strip()):
+       return True
+    if re.match("^-\s{0,3}\d+\s{0,3}-$", t.strip()):
+       return True
+    if re.match("(\d{4},\sNo.\d+)", t.strip()):
+       return True 
+
+    return False
+
+def memoized(method):
+    """ Cache the result of an extraction method until the bill is reloaded """
+
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        try:
+            return self._memo[name]
+        except KeyError:
+            result = self._memo[name] = method(self)
+            return result
+
+    return wrapper
+
+def _source_size(parser, source, *args, **kwargs):
+    return len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source)
+
+def _text_size(parser, text, *args, **kwargs):
+    return len(text)
+
+def _body_size(parser, *args, **kwargs):
+    return len(parser.body)
+
+def _count(parser, result):
+    return len(result)
+
+# instrumented stages: name -> (input size, output count), see RegParser.instrument
+STAGES = {
+    'load_pdf': (_source_size, lambda parser, result: len(parser.pages)),
+    'iter_pages': (_source_size, _count),
+    'header_pages': (_source_size, lambda parser, result: len(result[0]) + len(result[1])),
+    'clean_text': (_text_size, _count),
+    'strip_connection_phrase': (_text_size, _count),
+    'split_heading_and_body': (_text_size, lambda parser, result: len(result[1])),
+    'parse_body': (_text_size, _count),
+    'info': (None, lambda parser, result: sum(1 for v in result.values() if v)),
+    'get_philosophical_consideration': (lambda parser: len(parser.header), _count),
+    'get_legal_consideration': (lambda parser: len(parser.header), _count),
+    'get_definitions': (_body_size, _count),
+    'get_articles': (_body_size, _count),
+    'extract_all': (_body_size, lambda parser, result: sum(len(found) for found in result.values())),
+    'get_words': (None, _count),
+    'get_phrashes': (None, _count),
+}
+
+def decode_text(data: bytes):
+    """ Decode a plain text bill (UTF-8, falling back to Latin-1) """
+
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
 
 class RegParser:
     """ Indonesian Bill Text Parser.
         Parsing Bill published in PDF.          
     """                
 
-    def __init__(self, file, parse_now: bool = False):        
+    def __init__(self, file, parse_now: bool = False, cache=None, pages=None, executor=None, extractors=None, on_stage=None,
+                 header_only: bool = False, store=None):        
         self.__text = ""
-        self.rawtext = ""
+        self.header, self.body = "", ""
+        self.file = None
+        self.pages = []
+        self.fingerprints = []
+        self.cache = cache
+        self.extractors = extractors if extractors is not None else default_registry()
+        self._memo = {}
+        self._parsed_text = []
+        if on_stage is not None:
+            self.instrument(on_stage)
         from_pdf = '.pdf' in file
-        if file: self.load_pdf(file, from_pdf,  parse_now)
+        if file and store is not None and file in store:
+            self.load_store(store, file)
+        elif file: self.load_pdf(file, from_pdf,  parse_now, pages=pages, executor=executor, header_only=header_only)
+
+    def instrument(self, on_stage, on_start=None):
+        """ Report every stage of this parser (page extraction, cleaning, segmentation and extractions)
+        to a callback. Nothing is measured unless a parser is instrumented.
+
+        Args:
+            on_stage (callable): called with an inaregStats.Stage (bill, name, time, input size, output count)
+                after each stage, e.g. a ParseStats instance. Stages are nested, so the time of load_pdf
+                includes the time of clean_text, which includes strip_connection_phrase.
+            on_start (callable, optional): called with (bill, stage name) before each stage.
+        """
+
+        for name, (measure_input, measure_output) in STAGES.items():
+            method = getattr(type(self), name).__get__(self)
+            setattr(self, name, timed(self, name, method, measure_input, measure_output, on_stage, on_start))
+
+    def uninstrument(self):
+        for name in STAGES:
+            self.__dict__.pop(name, None)
+
+
+    def iter_pages(self, source, pages=None, executor=None, chunk_pages: int = 16):
+        """ Iterate over the text of each page, in page order.
+
+        Args:
+            source (str or bytes): PDF filename or content
+            pages (slice or tuple, optional): page range, e.g. (0, 10) or slice(-3, None). Defaults to all pages.
+            executor (Executor, optional): thread/process pool used to extract chunks of pages concurrently, 
+                each chunk with its own document handle. Defaults to None (sequential).
+            chunk_pages (int, optional): number of pages per executor task. Defaults to 16.
+
+        Yields:
+            [str]: page text
+        """
+
+        with open_pdf(source) as reader:
+            indices = range(reader.page_count)
+            if pages is not None:
+                indices = indices[pages if isinstance(pages, slice) else slice(*pages)]
+
+            if executor is None:
+                for i in indices:
+                    yield reader[i].get_text()
+                return
+
+        futures = []
+        for i in range(0, len(indices), chunk_pages):
+            chunk = indices[i:i + chunk_pages]
+            futures.append(executor.submit(extract_pages_text, source, chunk.start, chunk.stop, chunk.step))
+        for future in futures:
+            yield from future.result()
+
+    def header_pages(self, source, tail_pages: int = 3):
+        """ Extract only the pages needed for the heading and the signature block: pages from the
+        start until the end of the heading (plus one page, for markers spanning the page break),
+        and pages from the end until the signature block ("Disahkan di ...") and the page before it.
+
+        Args:
+            source (str or bytes): PDF filename or content
+            tail_pages (int, optional): maximum number of pages read from the end. Defaults to 3.
+
+        Returns:
+            [(list, list)]: (Text of the first pages, Text of the last pages), in page order
+        """
 
+        with open_pdf(source) as reader:
+            head, found = [], False
+            for i in range(reader.page_count):
+                head.append(reader[i].get_text())
+                if found:
+                    break
+                found = HEADING_END.search(''.join(head[-2:])) is not None
+
+            tail, signed = [], False
+            for i in range(reader.page_count - 1, len(head) - 1, -1):
+                if len(tail) == tail_pages:
+                    break
+                tail.append(reader[i].get_text())
+                if signed:
+                    break
+                signed = SIGNED_DATE.search(' '.join(''.join(tail[:-3:-1]).split())) is not None
+
+        return head, tail[::-1]
+
+    def load_header(self, file: str, tail_pages: int = 3):
+        """ Load only the heading of a bill: title, number and year, considerations and the dates
+        of the signature block. Only the first and last pages are extracted and the body is not
+        segmented, so `body` holds the text of the last pages and body-level methods
+        (articles, definitions, extractors, ...) return empty results.
+
+        Args:
+            file ([str]): filename
+            tail_pages (int, optional): maximum number of pages read from the end for the dates. Defaults to 3.
+        """
+
+        head, tail = self.header_pages(file, tail_pages)
+        self.pages = head + tail
 
-    def load_pdf(self, file: str, from_pdf=True, parse_now: bool = True):
+        self.__text = self.clean_text(''.join(head))
+        self.header, _ = self.split_heading_and_body(self.__text)
+        self.body = self.clean_text(''.join(tail)) if tail else ''
+        self.title = self.get_title()
+        self.tree = DocumentTree('')
+        self.parsed_text = []
+
+    def load_pdf(self, file: str, from_pdf=True, parse_now: bool = True, pages=None, executor=None,
+                 header_only: bool = False, fingerprint: bool = False):
         """ Load PDF from PDF. 
         Reccomend loading a bill from official gazette (peraturan.go.id)
 
         Args:
             file ([str]): filename
+            pages (slice or tuple, optional): only extract this page range (the cache is not used). Defaults to all pages.
+            executor (Executor, optional): pool used to extract pages concurrently. Defaults to None.
+            header_only (bool, optional): only load the heading, see load_header. Defaults to False.
+            fingerprint (bool, optional): keep the fingerprint of every page, so a new version of the bill
+                can be parsed incrementally with update. Defaults to False.
         """
         
         text = ''
+        key, entry = None, None
+        self.file = file
+        self._memo = {}
+        self.header_only = header_only and from_pdf
+        if self.header_only:
+            return self.load_header(file)
 
         if from_pdf:
             # text = extract_text(file)
-            reader = fitz.open(file)
-            for page in reader:
-                text += page.get_text()
+            source = file
+            if self.cache is not None and pages is None:
+                with open(file, "rb") as f:
+                    source = f.read()
+                key = self.cache.key(source)
+                entry = self.cache.get(key)
+
+            if entry is not None:
+                self.pages = entry['pages']
+            else:
+                self.pages = list(self.iter_pages(source, pages, executor))
+            self.fingerprints = page_fingerprints(source) if fingerprint and pages is None else []
+            text = ''.join(self.pages)
         else:
             with open(file, "rb") as f:
-                text = f.read()
+                text = decode_text(f.read())
+            self.pages = [text]
 
-        self.rawtext = text
+        # the clean text is only kept as header and body, see get_text
+        self.__text = None
         if parse_now:
-            self.__text = self.clean_text(text)       
+            if entry is not None and 'segments' in entry:
+                self.header, self.body = entry['header'], entry['body']
+                self.title = self.get_title()
+                self.tree = Segmenter(self.is_amandement).build(self.body, entry['segments'])
+                self.parsed_text = self.tree.parsed_text
+                return
+
+            text = self.clean_text(text)       
                     
-            self.header, self.body= self.split_heading_and_body(self.__text)
+            self.header, self.body= self.split_heading_and_body(text)
             # self.body, self.explanation = self.split_body_and_explanation(self.body)     
             self.title = self.get_title()
             self.parsed_text = self.parse_body(self.body)
+        else:
+            self.__text = ""
+
+        if key is not None and (entry is None or (parse_now and 'segments' not in entry)):
+            entry = {'pages': self.pages}
+            if parse_now:
+                entry.update(header=self.header, body=self.body, segments=self.tree.offsets())
+            self.cache.put(key, entry)
 
         
+    def update(self, file: str, previous):
+        """ Parse a new version of a bill (e.g. republished with a few pages corrected) incrementally.
+        Pages whose fingerprint is found in the previous version reuse its text instead of being
+        extracted again, and only the part of the body that changed is segmented again (see
+        Segmenter.update). The text is cleaned again as a whole. Fingerprints of the new version
+        are kept, so it can be the previous version of the next update.
+
+        Args:
+            file ([str]): filename of the new version
+            previous (RegParser): previous version, loaded with fingerprint=True (without fingerprints
+                every page is extracted, and only the segmentation is incremental)
+
+        Returns:
+            [Changes]: (Extracted pages, Pages whose text changed, Added sections, Removed sections of
+                the previous version, Changed sections)
+        """
+
+        known = dict(zip(previous.fingerprints, previous.pages))
+        old_pages = set(previous.pages)
+
+        self.file = file
+        self._memo = {}
+        self.header_only = False
+        self.__text = None
+        with open_pdf(file) as reader:
+            self.fingerprints = [page_fingerprint(reader, page) for page in reader]
+            self.pages, extracted = [], []
+            for i, fingerprint in enumerate(self.fingerprints):
+                if fingerprint in known:
+                    self.pages.append(known[fingerprint])
+                else:
+                    self.pages.append(reader[i].get_text())
+                    extracted.append(i)
+
+        self.header, self.body = self.split_heading_and_body(self.clean_text(''.join(self.pages)))
+        self.title = self.get_title()
+
+        segmenter = Segmenter(self.is_amandement)
+        if previous.is_amandement == self.is_amandement:
+            self.tree, added, removed, changed = segmenter.update(previous.tree, self.body)
+        else:
+            self.tree = segmenter.segment(self.body)
+            added, removed, changed = list(self.tree.segments), list(previous.tree.segments), []
+        self.parsed_text = self.tree.parsed_text
+
+        return Changes(extracted, [i for i, page in enumerate(self.pages) if page not in old_pages], added, removed, changed)
+
+    def load_store(self, store, file: str):
+        """ Load a bill from a TextStore (see inaregStore) without reading its PDF.
+        The stored document tree is reused when it was made by the same parser version;
+        rawtext is empty.
+
+        Args:
+            store (TextStore): store of clean texts
+            file ([str]): filename, as stored
+        """
+
+        self.file = file
+        self._memo = {}
+        self.header_only = False
+        self.pages = []
+        self.__text = None
+        self.header, self.body = store.texts(file)
+        self.title = self.get_title()
+
+        segments = store.segments(file)
+        if segments is not None:
+            self.tree = Segmenter(self.is_amandement).build(self.body, segments)
+            self.parsed_text = self.tree.parsed_text
+        else:
+            self.parsed_text = self.parse_body(self.body)
+
+    @property
+    def parsed_text(self):
+        """ Segments as a list of [Section Title, Text]. Set to the view of the document tree
+        (DocumentTree.parsed_text) when a bill is parsed, and made a list on first use.
+        """
+
+        if not isinstance(self._parsed_text, list):
+            self._parsed_text = list(self._parsed_text)
+        return self._parsed_text
+
+    @parsed_text.setter
+    def parsed_text(self, value):
+        self._parsed_text = value
+
+    @property
+    def rawtext(self):
+        """ Original text, joined from the pages on request """
+
+        return ''.join(self.pages)
+
+    def compact(self):
+        """ Drop the original page text, keeping the clean text (header and body), the document
+        tree offsets and the computed results. Use it to keep many parsed bills in memory;
+        rawtext is empty afterwards.
+        """
+
+        self.pages = []
+        if getattr(self, 'tree', None) is not None:
+            # back to the view of the tree, the texts stay in the body
+            self._parsed_text = self.tree.parsed_text
+
     def get_rawtext(self):
         """ Get Raw Text
         
@@ -56,19 +484,57 @@ class RegParser:
 
         return self.rawtext
         
+    def iter_connection_phrase(self, text):
+        """ Find page-continuation markers in a single pass.
+        A bill page ends with the first words of the next page followed by "...",
+        e.g. "... kepada Menteri ... kepada Menteri untuk ...".
+
+        Args:
+            text (str): text with spaces collapsed
+
+        Yields:
+            [(int, int, str)]: (Start, End, Phrase) of each marker, including the repeated words
+        """
+
+        last = 0
+        for m in CONNECTION_MARKER.finditer(text):
+            start, end = m.span()
+            head = text[last:start].rstrip()
+            s1 = head.rsplit(maxsplit=2)[-2:]
+            s2 = NEXT_TWO_WORDS.match(text, end)
+            prev, last = last, end
+
+            if len(s1) < 2 or not s2 or s1[-1] != s2.group(2) or s1[-2] != s2.group(1):
+                continue
+
+            # start of the repeated words, skipping the whitespace between them
+            cut = text.rindex(s1[-2], prev, prev + len(head) - len(s1[-1]))
+            yield (cut, end, f"{s1[-2]} {s1[-1]}{m.group(0)}")
+
     def check_connection_phrase(self, text):
         text = re.sub(' +',' ', text)
-        found = []
-        while m := re.search("(\s?\.\.\.\s)", text):
-            pot1 = text[: m.span()[0]]
-            pot2 = text[m.span()[1]: ]
-            s1= pot1.split()
-            s2= pot2.split()
-            if (s1[-1] == s2[1]) and (s1[-2] == s2[0]):
-                found.append(f"{s1[-2]} {s1[-1]}{text[m.span()[0]: m.span()[1]]}")
-            text = text[m.span()[1]:]
-
-        return found
+
+        return [phrase for _, _, phrase in self.iter_connection_phrase(text)]
+
+    def strip_connection_phrase(self, text):
+        """ Remove page-continuation markers and the repeated words before them
+
+        Args:
+            text (str): text
+
+        Returns:
+            [str]: text without continuation markers
+        """
+
+        text = re.sub(' +',' ', text)
+        pieces = []
+        last = 0
+        for start, end, _ in self.iter_connection_phrase(text):
+            pieces.append(text[last:start])
+            last = end
+        pieces.append(text[last:])
+
+        return ''.join(pieces)
 
     def clean_text(self, text: str):
         """ Clean Bill Text 
@@ -80,42 +546,78 @@ class RegParser:
             [type]: Clean Text
         """        
 
-        # remove unknown character
-        text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\xff]', '', text)      
-        text = re.sub('\s+(\.\s+){3}','...', text)
-        text = re.sub('\s+…','...', text)
-        text = re.sub('\s+\.\.\.[^[\.]]','...', text)
-        
+        text = normalize_characters(text)
 
         # remove common unnecessary part
-        text = text.split('\n')
-        temp = []
-        for t in text:
-            if "PRESIDEN" in t.strip():
-               continue
-            if "REPUBLIK INDONESIA" in t.strip():
-               continue
-            if re.match("SK\s+No\s+\d+.+?A", t):
-               continue
-            if re.match("\w\.{3}$", t.strip()):
-               continue
-            if re.match("^www.+\.go\.id", t.strip()):
-               continue
-            if re.match("^-\s{0,3}\d+\s{0,3}-$", t.strip()):
-               continue
-            if re.match("(\d{4},\sNo.\d+)", t.strip()):
-               continue 
-
-            temp.append(t)
+        temp = [t for t in text.split('\n') if not is_noise_line(t)]
 
         text = ' '.join(temp) 
 
-        conn_phrases = self.check_connection_phrase(text)
-        for cp in conn_phrases:
-            text = text.replace(cp, '')
+        text = self.strip_connection_phrase(text)
 
         return re.sub("\s{2,}"," ", text)
 
+    def iter_clean_text(self, pages):
+        """ Clean the text of a bill page by page, see clean_text.
+        Ellipses, lines and continuation markers can span a page break, so the last lines
+        of a page and the words around a pending continuation marker are held back until
+        the next page is read.
+
+        Args:
+            pages (iterable): text of each page, e.g. iter_pages
+
+        Yields:
+            [str]: successive pieces of the clean text; joined, they equal clean_text of all pages
+        """
+
+        carry, held, space = '', '', ''
+        first = True
+        for page in chain(pages, [None]):
+            final = page is None
+            lines = normalize_characters(carry + (page or '')).split('\n')
+            if not final:
+                # the last complete line and the incomplete one are normalized again with the next page
+                carry = '\n'.join(lines[-2:])
+                lines = lines[:-2]
+
+            lines = [t for t in lines if not is_noise_line(t)]
+            if not lines:
+                if not final:
+                    continue
+                piece = ''
+            else:
+                piece = ('' if first else ' ') + ' '.join(lines)
+                first = False
+
+            text = re.sub(' +', ' ', held + piece)
+            safe = len(text)
+            if not final:
+                # a marker needs the two (complete) words after it, and removes the two words before it
+                safe = word_start(text, len(text), 3)
+                for m in CONNECTION_MARKER.finditer(text, max(0, safe - 5)):
+                    if m.end() > safe:
+                        safe = word_start(text, m.start(), 2)
+                        break
+
+            pieces = []
+            last = 0
+            for cut, end, _ in self.iter_connection_phrase(text):
+                if end > safe:
+                    safe = min(safe, cut)
+                    break
+                pieces.append(text[last:cut])
+                last = end
+            pieces.append(text[last:max(safe, last)])
+            held = text[max(safe, last):]
+
+            clean = re.sub(r"\s{2,}", " ", space + ''.join(pieces))
+            stripped = clean.rstrip()
+            space = clean[len(stripped):]
+            if final:
+                stripped = clean
+            if stripped:
+                yield stripped
+
     def split_heading_and_body(self, text):        
         """ Split bill heading and body text  
 
@@ -127,10 +629,38 @@ class RegParser:
                 found = re.search(r"Menetapkan\s*:[^\.]*\.*?", text)
             else:
                 found = re.search(r"MEMUTUSKAN\s*:[^\.]*\.*?", text)
-            return (self.__text[:found.span()[1]+1], self.__text[found.span()[1]+1:])
+            return (text[:found.span()[1]+1], text[found.span()[1]+1:])
         except:
             return text, text
         
+    def iter_heading_and_body(self, chunks):
+        """ Split bill heading and body while reading pieces of clean text, see split_heading_and_body.
+        Pieces are read until the end of the heading; the body is returned as an iterator.
+
+            Returns:
+                [(str, iterator)]: (Heading, Pieces of the body)
+        """
+
+        chunks = iter(chunks)
+        text, pattern, pos = '', None, 0
+        for chunk in chain(chunks, [None]):
+            final = chunk is None
+            if not final:
+                text += chunk
+            if pattern is None:
+                if len(text) < 64 and not final:
+                    continue
+                pattern = ENACTING_CLAUSE if ENACTING_CLAUSE.match(text) else DECISION_CLAUSE
+
+            found = pattern.search(text, pos)
+            if found is not None and (found.end() < len(text) or final):
+                end = found.end() + 1
+                return text[:end], chain([text[end:]], chunks)
+            if final:
+                return text, iter([text])
+            # the heading clause is searched again from its start, or near the end of the text read
+            pos = found.start() if found is not None else max(0, len(text) - 64)
+
     def split_body_and_explanation(self, text):
         """ Split bill body and explnation body text  
 
@@ -151,65 +681,18 @@ class RegParser:
                 [(id, text))]: (Section Title, Text)
         """
 
-        is_amandement = 'perubahan atas' in self.title.lower()
-        
-        chunks = [body]
-        rs = []
-        if is_amandement:
-            rs.extend([
-                re.compile(r"((Pasal\sI).+?((?=\s+Pasal\sII)))|((Pasal\sII).+?((?=$|\s+Pasal\sI)))"),
-                re.compile(r"""(\d+\.\s{0,3}(Judul|Ketentuan|Di\s+antara).+?berbunyi\s+sebagai\s+berikut\s?:)|(\d+\.\s{0,3}Ketentuan\sPasal\s\w+\sdihapus)|(\d+\.\s{0,3}Pasal\s).+?((tercantum|ditetapkan)\s+dalam\s+penjelasan(\s+pasal\s+demi\s+pasal\s+([Uu]ndang-[Uu]ndang\s+ini)?)?\.?)""")
-            ]) 
-
-        rs.extend([
-            re.compile(r"(BAB\s.+?(?=$|(\sBAB)))"),
-            re.compile(r"(Bagian\s+Ke.+?(?=$|(\sBagian\s+Ke.+)))"),
-            re.compile(r"(Paragraf\s+\d+.+?(?=$|(\sParagraf\s+\d+)))"),
-            re.compile(r"(((?<!dalam)\sPasal\s\d+).+?)(?=$|(?<!dalam)\sPasal\s\d+)")
-            ])
+        self.tree = Segmenter(self.is_amandement).segment(body)
 
-        
-        for index, r in enumerate(rs):
-            temp = chunks.copy(); chunks = []
-            for text in temp:
-                if "$AmmendedItem=>" in text: 
-                    chunks.append(text.strip())
-                else:
-                    while match := re.search(r, text):
-                        chunks.append(text[:match.span()[0]].strip())
-                        found = text[match.span()[0]:match.span()[1]]
-                        if index != 1 or not is_amandement:
-                            chunks.append(found.strip())
-                        else:
-                            chunks.append(f"$AmmendedItem=> {found.strip()}")
-                        text = text[match.span()[1]:]
-                    if len(text.strip())>0:
-                        chunks.append(text.strip())
-
-        chunks = [x for x in chunks if len(x)>0]
-        
-        rs2 = [
-            re.compile(r"(^Pasal\sI+(?=\s))"),
-            re.compile(r"(^\$AmmendedItem=>(?=\s))"),
-            re.compile(r"(^BAB\s[A-Z]+(?=\s))"),
-            re.compile(r"(^Bagian\sKe\w+(?=\s))"),
-            re.compile(r"(^Paragraf\s\d+(?=\s))"),
-            re.compile(r"(^Pasal\s\d+(?=\s))") if not is_amandement else re.compile(r"(^\"?Pasal\s\d+[A-Z]?(?=\s))"),        
-        ]
-
-        parsed_data = []
-        for text in chunks:
-            for i, r in enumerate(rs2):
-                if re.match(r, text):
-                    splited_text = [x.strip() for x in re.split(r, text, maxsplit=1) if len(x)>0]
-                    parsed_data.append(splited_text)
-                    break
-                if i==len(rs2) - 1:
-                    parsed_data.append(["Unknown", text])
-                
+        return self.tree.parsed_text
 
-        return parsed_data
+    @property
+    @memoized
+    def is_amandement(self):
+        """ Whether the bill amends another bill """
 
+        return 'perubahan atas' in self.title.lower()
+
+    @memoized
     def info(self):
         """ Retrieve general information about the bill (number, year, enacment etc.)
 
@@ -220,8 +703,7 @@ class RegParser:
         result = dict()
 
         # extract number and year
-        cr = re.compile(r"NOMOR\s+(\d+)\s+TAHUN\s+(\d{4})\s+TENTANG", re.MULTILINE|re.IGNORECASE)
-        if res := cr.search(self.header):
+        if res := NUMBER_YEAR.search(self.header):
             numberyear = res.groups(0)
             result['number'] = int(numberyear[0]) if numberyear[0].isdigit() else numberyear[0]
             result['year'] = int(numberyear[1]) if numberyear[1].isdigit() else numberyear[1]
@@ -230,31 +712,28 @@ class RegParser:
             result['year'] = None              
 
         # extract signed date
-        cr2 = re.compile(r"[dD]isahkan\s+di\s+(.+)\spada\s+tanggal\s+(\d+\s\w+\s\d{4})", re.MULTILINE|re.IGNORECASE)        
-        if res2 := cr2.search(self.body):
+        if res2 := SIGNED_DATE.search(self.body):
             signed_date = res2.groups(0)[1]
             result['signed_date'] = int(signed_date) if signed_date.isdigit() else signed_date
         else:
             result['signed_date'] = None            
 
         # extract enactment date
-        cr3 = re.compile(r"diundangkan\s+di\s+(.+)\spada\stanggal\s(\d+\s\w+\s\d{4})", re.MULTILINE|re.IGNORECASE)
-        if res3 := cr3.search(self.body):
+        if res3 := ENACTMENT_DATE.search(self.body):
             enactment_date = res3.groups(0)[1]
             result['enactment_date'] = int(enactment_date) if enactment_date.isdigit() else enactment_date
         else:
             result['enactment_date'] = None
 
         # extract effective date
-        cr4 = re.compile(r"\s+ini\s+mulai\s+berlaku\s+pada\s+tanggal\s+(\d+\s\w+\s\d{4})", re.MULTILINE|re.IGNORECASE)
-        if res4 := cr4.search(self.body):            
+        if res4 := EFFECTIVE_DATE.search(self.body):            
             effective_date = res4.groups(1)[0]
             result['effective_date'] = int(effective_date) if effective_date.isdigit() else effective_date
         else:
             result['effective_date'] = result['enactment_date'] 
 
         # extract that the bill is amandement or not
-        result['is_amandement'] = 'perubahan atas' in self.title.lower()
+        result['is_amandement'] = self.is_amandement
         
         return result
         
@@ -265,8 +744,12 @@ class RegParser:
                 [str]: (Full Text)
         """
 
-        return self.__text
+        if self.__text is not None:
+            return self.__text
+        # header and body are the same text when the bill has no heading
+        return self.body if self.header is self.body else self.header + self.body
 
+    @memoized
     def get_articles(self):
         """ Retrieve bill articles  
 
@@ -274,10 +757,45 @@ class RegParser:
                 [str]: (Article Text)
         """
 
-        articles = [x for x in self.parsed_text if "Pasal" in x[0]]
+        articles = [[node.label, node.text.strip()] for node in self.tree.segments if "Pasal" in node.label]
         
         return articles
 
+    @property
+    def index(self):
+        """ Index of the articles, BAB and Bagian of the bill (see inaregSegmenter.StructureIndex) """
+
+        return self.tree.index
+
+    def iter_articles(self, source=None, executor=None):
+        """ Iterate over the articles (Pasal) with their BAB, Bagian and Paragraf context
+        (see Section.context and Section.ancestors).
+        Without a source, the articles of the loaded bill are used. With a PDF, pages are extracted,
+        cleaned and segmented as a stream: each article is yielded as soon as the pages containing it
+        have been read, so a consumer that stops early never extracts the rest of the PDF.
+
+        Args:
+            source (str or bytes, optional): PDF filename or content. Defaults to the loaded bill.
+            executor (Executor, optional): pool used to extract pages concurrently, see iter_pages. Defaults to None.
+
+        Yields:
+            [Section]: article sections, label and text as in get_articles
+        """
+
+        if source is None:
+            sections = self.tree.segments
+        else:
+            header, body = self.iter_heading_and_body(self.iter_clean_text(self.iter_pages(source, executor=executor)))
+            try:
+                is_amandement = 'perubahan atas' in self.get_title(header).lower()
+            except IndexError:
+                is_amandement = False
+            sections = Segmenter(is_amandement).iter_sections(body)
+
+        for node in sections:
+            if "Pasal" in node.label:
+                yield node
+
     def get_header(self):
         """ Retrieve bill heading text  
 
@@ -296,15 +814,13 @@ class RegParser:
 
         return self.body
 
+    @memoized
     def get_definitions(self):                
         """ Parsing Definitions used in the Bill
 
         Returns:
             [list]: (List of definitions)
         """         
-        r1 = re.compile(r"^(.+)( adalah )", re.IGNORECASE);
-        r2 = re.compile(r"(disingkat|(disebut)|disingkat,|disebut,)(.+)", re.IGNORECASE);
-
         definitions = []
         for id, text in self.get_articles():
             chunks = []
@@ -318,9 +834,9 @@ class RegParser:
                 chunks.append(text.strip())
 
             for chunk in chunks:
-                if res1 := r1.search(chunk):
+                if res1 := DEFINITION_TERM.search(chunk):
                     found = res1.groups(0)[0].strip()
-                    if res2 := r2.search(found):
+                    if res2 := DEFINITION_ALIAS.search(found):
                         found = res2.groups(0)[2].strip()     
                         
                     terms = re.split("(adalah|yang\sselanjutnya)", chunk.strip())[0].strip()
@@ -331,6 +847,7 @@ class RegParser:
         return definitions
 
     
+    @memoized
     def get_legal_consideration(self):
         """ Parsing Philosophical Consideration
 
@@ -338,11 +855,11 @@ class RegParser:
             [(str, str)]: (Number and Consideration Text)
         """        
 
-        cr = re.compile(r"(\d+\.\s+(Undang|Peraturan|Keputusan|TAP|Pasal).+?\;)", re.MULTILINE|re.IGNORECASE)
-        consideration = cr.findall(self.header)        
+        consideration = LEGAL_CONSIDERATION.findall(self.header)        
                 
         return consideration
     
+    @memoized
     def get_philosophical_consideration(self):
         """ Parsing Legal Consideration
 
@@ -350,66 +867,53 @@ class RegParser:
             [(str, str)]: (Number and Consideration Text)
         """      
 
-        cr = re.compile(r"[a-z]\.\sbahwa.+?\;", re.MULTILINE|re.IGNORECASE)
-        consideration = cr.findall(self.header)        
+        consideration = PHILOSOPHICAL_CONSIDERATION.findall(self.header)        
                 
         return consideration
         
-    def get_title(self):
+    def get_title(self, header=None):
         """ Parsing Bill Title
 
+        Args:
+            header (str, optional): bill heading. Defaults to the heading of the loaded bill.
+
         Returns:
             [str]: Title
         """      
     
         # try:
-        cr = re.compile(r"MENETAPKAN\s?:.+?\.", re.MULTILINE|re.IGNORECASE)
-        return cr.findall(self.header)[0].split("TENTANG")[1].strip()
+        return TITLE.findall(self.header if header is None else header)[0].split("TENTANG")[1].strip()
         # except:
         return "Unknownxx"
 
-    def get_words(self, n = -1, exclude_stopword=False):           
+    def get_word_counts(self, exclude_stopword=True):
+        """ Get the frequency of every word in the text (document-level term frequency).
+
+        Args:
+            exclude_stopword (bool, optional): If true will exclude stopword from the result. Defaults to True.
+
+        Returns:
+            [Counter]: word -> frequency
+        """
+
+        key = ('word_counts', exclude_stopword)
+        if key not in self._memo:
+            self._memo[key] = word_counts(self.get_text(), exclude_stopword)
+
+        return self._memo[key]
+
+    def get_words(self, n = -1, exclude_stopword=True):           
         """ Get token/words appear in the text.
 
         Args:
             n (int): number of retrieved words
-            exclude_stopword (bool, optional): If false will include stopword in the result. Defaults to False.
+            exclude_stopword (bool, optional): If true will exclude stopword from the result. Defaults to True.
 
         Returns:
             [list(tuple)]: list of word and frequency of occurence
         """
 
-        dict_counts = dict()
-        words = self.__text.split()
-
-        for w in words:
-            w = w.lower().strip().strip('.')            
-            if w.isdigit(): continue
-            if w in dict_counts: dict_counts[w] += 1
-            else: dict_counts[w] = 1
-        
-        # exclude numbering and bullets                
-        for w in list(dict_counts.keys()):
-            if re.match(r"([a-z]\.)|([a-z]\))|(\([a-z]\))|(\d+\.)|(\d+\))|(\(\d+\))",w):
-                del dict_counts[w]
-
-        # exclude single character
-        for w in list(dict_counts.keys()):
-            if len(w) == 1:
-                del dict_counts[w]                
-
-        # exclude stopword             
-        if not exclude_stopword:
-            with open('stopwords.txt', 'r') as f:                
-                stopword = f.read().splitlines()                                
-                for w in list(dict_counts.keys()):
-                    if w in stopword: 
-                        del dict_counts[w]
-        
-        # check if n is not defined, then return all words
-        if n == -1: n = len(words)
-
-        return sorted(dict_counts.items(), reverse=True, key=lambda x: x[1])[:n]
+        return most_frequent(self.get_word_counts(exclude_stopword), n)
 
     def generate_ngrams(self, text, n = 2):
         text = text.lower()
@@ -429,37 +933,9 @@ class RegParser:
             [(str, int)]: (List of tuple of Phrases and Occurences)
         """  
                 
-        phrases = []
-        preposition = ['dan','atau','yang','dan/atau','dalam','di','pada','untuk','sebagaimana','atas','bawah','dapat',
-        'sesuai','saat','paling','oleh','dari','meliputi','terdiri','serta','dengan','ini','lain','dimaksud','maksud',
-        'berdasarkan','tentang','berupa','sejak','paling','tetapi','namun','melainkan','tapi','kecuali','terdapat','ada',
-        'ayat','pasal','huruf', 'selanjutnya','sebelumnya','adalah','sebagai','disebut','disingkat','secara','melalui']
-
-        for i in range(2, max_word + 1):
-            phrases.extend(self.generate_ngrams(text = self.__text, n = i))
-
-        dict_counts = dict()       
-        for p in phrases:
-            p = p.lower().strip().strip('.')                        
-            if p in dict_counts: dict_counts[p] += 1
-            else: dict_counts[p] = 1
-
-        for k in list(dict_counts.keys()):
-            if dict_counts[k] < min_occurence:
-                del dict_counts[k]
-                continue
-
-            token = k.split()
-            if (token[0] in preposition) or (token[-1] in preposition):
-                del dict_counts[k]
-                continue
-
-            if (token[0].isdigit()) or (token[-1].isdigit()):
-                del dict_counts[k]
-                continue                     
-
-        return sorted(dict_counts.items(), reverse=True, key=lambda x: x[1])
+        return PhraseMiner(max_word, min_occurence).mine([self.get_text()])
 
+    @memoized
     def get_heading(self):
         """ Get Bill's Heading 
 
@@ -467,10 +943,61 @@ class RegParser:
             [(str)]: (List of Heading)
         """  
 
-        heading = [x for x in self.parsed_text if "Pasal" not in x[0] and "$AmmendedItem=>" not in x[0] and "Unknown" not in x[0]]   
+        heading = [[node.label, node.text.strip()] for node in self.tree.segments
+                   if "Pasal" not in node.label and "$AmmendedItem=>" not in node.label and "Unknown" not in node.label]   
 
         return heading
 
+    def register_extractor(self, name: str, pattern, group=0, transform=None, trigger: str = None, flags: int = 0):
+        """ Register a custom extractor, run together with the built-in ones by extract_all
+
+        Args:
+            name (str): extractor name
+            pattern (str): regular expression
+            group (int, optional): group returned as value. Defaults to 0.
+            transform (callable, optional): function of the match returning the value.
+            trigger (str, optional): literal text a section must contain to be scanned.
+        """
+
+        self.extractors.register(name, pattern, group, transform, trigger, flags)
+        self._memo.clear()
+
+    @memoized
+    def extract_all(self):
+        """ Run every registered extractor over every section in one pass
+
+        Returns:
+            [dict]: extractor name -> [Extraction(extractor, section, value, start, end)], offsets in the body
+        """
+
+        sections = ((node.label, node.text_start, node.end) for node in self.tree.segments)
+        return self.extractors.scan(self.body, sections)
+
+    def extract(self, name: str):
+        """ Retrieve every match of a registered extractor
+
+        Returns:
+            [list]: list of Extraction
+        """
+
+        return self.extract_all()[name]
+
+    def _first_per_section(self, *names):
+        found = [self.extract(name) for name in names]
+        pos = [0] * len(found)
+        result = []
+        for node in self.tree.segments:
+            for i, matches in enumerate(found):
+                first = None
+                while pos[i] < len(matches) and matches[pos[i]].start < node.end:
+                    first = first or matches[pos[i]]
+                    pos[i] += 1
+                if first:
+                    result.append((first.section, first.value))
+
+        return result
+
+    @memoized
     def get_further_provision(self):
         """ Get Further Permission mandated by the Bill
 
@@ -478,52 +1005,44 @@ class RegParser:
             [(str, str)]: (List of Further Permission)
         """     
 
-        r = re.compile(r"(Ketentuan lebih lanjut mengenai)(.*)((dituangkan dalam)|(diatur dengan)(.*))")
-        provisions = []
-        for id, sentence in self.parsed_text:
-            if found := r.search(sentence):
-                found = found.groups(2)
-                found = (found[1].strip().split("sebagaimana dimaksud")[0], found[5].strip())
-                provisions.append((id, found))
-
-        return provisions
+        return self._first_per_section('further_provision')
 
+    @memoized
     def extract_currency(self):
-        cr1 = re.compile(r"(Rp)([+-]?[0-9]{1,3}(\.?[0-9]{3})*)(,[0-9]{1,4})")
-        cr2 = re.compile(r"(USD)([+-]?[0-9]{1,3}(,?[0-9]{3})*)(\.[0-9]{1,4})")
-
-        currencies = []
-        for id, sentence in self.parsed_text:
-            if found := cr1.search(sentence):
-                currencies.append((id, found.group(0)))
-            if found2 := cr2.search(sentence):
-                currencies.append((id, found2.group(0)))                
-
-        return currencies
-
+        return self._first_per_section('currency_rp', 'currency_usd')
 
+    @memoized
     def extract_percent(self):
-        cr = re.compile(r"([+-]?[0-9]{1,3}(\.?[0-9]{3})*)%")
+        return self._first_per_section('percent')
 
-        percents = []
-        for id, sentence in self.parsed_text:
-            if found := cr.search(sentence):
-                percents.append((id, found.group(0)))
+    @memoized
+    def extract_withdraw_provision(self):
+        return self._first_per_section('withdraw_provision')
 
-        return percents        
+    articles = property(get_articles)
+    definitions = property(get_definitions)
+    heading = property(get_heading)
+    legal_consideration = property(get_legal_consideration)
+    philosophical_consideration = property(get_philosophical_consideration)
+    further_provision = property(get_further_provision)
+    currency = property(extract_currency)
+    percent = property(extract_percent)
+    withdraw_provision = property(extract_withdraw_provision)
 
-    def extract_withdraw_provision(self):
-        cr = re.compile(r"Pada saat Undang-Undang ini mulai berlaku(.*)dicabut dan dinyatakan")
-        result = []
-        for id, sentence in self.parsed_text:
-            if found := cr.search(sentence):
-                result.append((id, found.group(1).strip(', :')))        
+    def header_json(self, return_dict = True):
+        """ Heading of the bill, all that is available after load_header """
 
-        return result
+        result = dict()
+        result['title'] = self.title
+        result['info'] = self.info()
+        result['philosophical_consideration'] = self.get_philosophical_consideration()
+        result['legal_consideration'] = self.get_legal_consideration()
+
+        return json.dumps(result) if not return_dict else result
 
     def to_json(self, return_dict = False):
         result = dict()
-        result['title'] = self.get_title()
+        result['title'] = self.title
         result['info'] = self.info()
         result['philosophical_consideration'] = self.get_philosophical_consideration()
         result['legal_consideration'] = self.get_legal_consideration()
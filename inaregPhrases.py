@@ -0,0 +1,187 @@
+import re
+import tempfile
+from array import array
+from collections import Counter
+from itertools import repeat
+
+PREPOSITIONS = frozenset([
+    'dan','atau','yang','dan/atau','dalam','di','pada','untuk','sebagaimana','atas','bawah','dapat',
+    'sesuai','saat','paling','oleh','dari','meliputi','terdiri','serta','dengan','ini','lain','dimaksud','maksud',
+    'berdasarkan','tentang','berupa','sejak','paling','tetapi','namun','melainkan','tapi','kecuali','terdapat','ada',
+    'ayat','pasal','huruf', 'selanjutnya','sebelumnya','adalah','sebagai','disebut','disingkat','secara','melalui'])
+
+NON_ALPHANUMERIC = re.compile(r'[^a-zA-Z0-9\s]')
+
+
+class TokenStore:
+    """ Sequence of integer arrays (one per document), kept in memory or spilled to a
+        temporary file so that a whole corpus can be scanned several times with bounded memory.
+    """
+
+    def __init__(self, spill: bool = False):
+        self.file = tempfile.TemporaryFile() if spill else None
+        self.arrays = []
+        self.lengths = array('q')
+
+    def append(self, values: array):
+        if self.file is None:
+            self.arrays.append(values)
+        else:
+            values.tofile(self.file)
+        self.lengths.append(len(values))
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __iter__(self):
+        if self.file is None:
+            yield from self.arrays
+            return
+
+        self.file.flush()
+        self.file.seek(0)
+        for length in self.lengths:
+            values = array('i')
+            values.fromfile(self.file, length)
+            yield values
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class PhraseMiner:
+    """ Streaming n-gram phrase miner.
+        Text is tokenized once into integer token ids. N-grams are counted level by level
+        (2-grams, 3-grams, ...) and an n-gram is only counted when its (n-1)-gram prefix already
+        occurs at least `min_occurence` times, so infrequent prefixes are never extended.
+    """
+
+    def __init__(self, max_word: int = 5, min_occurence: int = 2, stopwords=PREPOSITIONS):
+        """
+        Args:
+            max_word (int, optional): maximum number of words of a phrase. Defaults to 5.
+            min_occurence (int, optional): minimum number of occurences of a phrase. Defaults to 2.
+            stopwords (set, optional): a phrase may not start or end with these words. Defaults to PREPOSITIONS.
+        """
+
+        self.max_word = max_word
+        self.min_occurence = min_occurence
+        self.stopwords = stopwords
+        self.vocabulary = {}
+        self.words = []
+
+    def tokenize(self, text: str):
+        """ Convert a text into token ids
+
+        Returns:
+            [array]: token ids
+        """
+
+        vocabulary, words = self.vocabulary, self.words
+        ids = array('i')
+        for token in NON_ALPHANUMERIC.sub(' ', text.lower()).split(" "):
+            if token == "":
+                continue
+            if (i := vocabulary.get(token)) is None:
+                i = vocabulary[token] = len(words)
+                words.append(token)
+            ids.append(i)
+
+        return ids
+
+    def mine(self, texts, spill: bool = False):
+        """ Mine phrases from one or many texts.
+        Texts are consumed once, so a generator of bill texts can be used for a corpus.
+
+        Args:
+            texts (iterable): texts
+            spill (bool, optional): keep token ids in a temporary file instead of memory. Defaults to False.
+
+        Returns:
+            [(str, int)]: (List of tuple of Phrases and Occurences), most frequent first
+        """
+
+        tokens = TokenStore(spill)
+        unigrams = Counter()
+        for text in texts:
+            ids = self.tokenize(text)
+            unigrams.update(ids)
+            tokens.append(ids)
+
+        # id of each frequent n-gram, its (prefix id, last token) and occurences
+        grams = []
+        frequent = {}
+        for token, count in unigrams.items():
+            if count >= self.min_occurence:
+                frequent[token] = len(grams)
+                grams.append((-1, token, count))
+
+        prefixes = TokenStore(spill)
+        for ids in tokens:
+            prefixes.append(array('i', (frequent.get(t, -1) for t in ids)))
+
+        levels = []
+        for n in range(2, self.max_word + 1):
+            # (prefix id, next token) pairs; pairs with an infrequent prefix (-1) are dropped
+            counts = Counter()
+            for ids, prefix in zip(tokens, prefixes):
+                counts.update(zip(prefix, ids[n - 1:]))
+            counts = {key: count for key, count in counts.items() if key[0] >= 0}
+
+            frequent = {}
+            for key, count in counts.items():
+                if count >= self.min_occurence:
+                    frequent[key] = len(grams)
+                    grams.append((key[0], key[1], count))
+            levels.append(frequent)
+            if not frequent:
+                break
+
+            following = TokenStore(spill)
+            for ids, prefix in zip(tokens, prefixes):
+                following.append(array('i', map(frequent.get, zip(prefix, ids[n - 1:]), repeat(-1))))
+            prefixes.close()
+            prefixes = following
+
+        tokens.close()
+        prefixes.close()
+
+        phrases = []
+        for frequent in levels:
+            for gid in frequent.values():
+                words = self._words(grams, gid)
+                if self._is_phrase(words):
+                    phrases.append((" ".join(words), grams[gid][2]))
+
+        return sorted(phrases, reverse=True, key=lambda x: x[1])
+
+    def _words(self, grams, gid):
+        words = []
+        while gid >= 0:
+            prefix, token, _ = grams[gid]
+            words.append(self.words[token])
+            gid = prefix
+        return words[::-1]
+
+    def _is_phrase(self, words):
+        first, last = words[0], words[-1]
+        if first in self.stopwords or last in self.stopwords:
+            return False
+        return not (first.isdigit() or last.isdigit())
+
+
+def mine_phrases(texts, max_word: int = 5, min_occurence: int = 2, spill: bool = True):
+    """ Mine phrases across a corpus with bounded memory
+
+    Args:
+        texts (iterable): bill texts, e.g. RegParser.get_text() of each bill
+        max_word (int, optional): maximum number of words of a phrase. Defaults to 5.
+        min_occurence (int, optional): minimum number of occurences in the corpus. Defaults to 2.
+        spill (bool, optional): keep token ids in a temporary file. Defaults to True.
+
+    Returns:
+        [(str, int)]: (List of tuple of Phrases and Occurences)
+    """
+
+    return PhraseMiner(max_word, min_occurence).mine(texts, spill=spill)
@@ -0,0 +1,380 @@
+""" Cross-references between the articles of bills.
+
+    python inaregReferences.py build sample/ -o references.json -j 8
+    python inaregReferences.py cited-by references.json "UU 9/2018" --pasal "Pasal 3"
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+from functools import partial
+from multiprocessing import Pool
+
+from inaregCache import BillCache
+from inaregCorpus import find_bills
+from inaregParser import TITLE, RegParser
+from inaregSegmenter import pasal_key
+
+# a reference from an article (pasal is None for the heading of the bill) to a bill, one of its
+# articles and ayat; resolved when the target is a known article (or bill when target_pasal is None)
+Reference = namedtuple("Reference", ["bill", "pasal", "target_bill", "target_pasal", "target_ayat", "resolved", "text"])
+
+# kinds of bills and their short names, longest first
+KINDS = [
+    ("PERATURAN PEMERINTAH PENGGANTI UNDANG-UNDANG", "Perppu"),
+    ("UNDANG-UNDANG", "UU"),
+    ("PERATURAN PEMERINTAH", "PP"),
+    ("PERATURAN PRESIDEN", "Perpres"),
+]
+
+CONSTITUTION = "UUD 1945"
+
+LAW = (r"(?P<constitution>Undang-Undang\s+Dasar\s+Negara\s+Republik\s+Indonesia\s+Tahun\s+1945)"
+       r"|(?P<kind>" + "|".join(re.escape(kind).replace(r"\ ", r"\s+") for kind, _ in KINDS) + r")"
+       r"\s+Nomor\s+(?P<number>\d+)\s+Tahun\s+(?P<year>\d{4})")
+PASAL_ITEM = r"Pasal\s+(\d+[A-Z]?)(?:\s+ayat\s+\((\d+)\))?(?:\s+huruf\s+[a-z]\b)?"
+SEPARATOR = r"(?:\s*,\s*(?:dan\s+|atau\s+)?|\s+(?:dan|atau|sampai\s+dengan)\s+)"
+
+# a list of articles, optionally followed by the bill they belong to, or a bill alone
+REFERENCE = re.compile(rf"(?=Pasal|Undang|Peraturan)(?P<pasal>{PASAL_ITEM}(?:{SEPARATOR}{PASAL_ITEM})*)?\s*(?P<law>{LAW})?", re.IGNORECASE)
+# "sebagaimana dimaksud pada ayat (1)": an ayat of the same article
+AYAT_REFERENCE = re.compile(r"pada\s+(ayat\s+\(\d+\)(?:" + SEPARATOR + r"ayat\s+\(\d+\))*)")
+ITEM = re.compile(PASAL_ITEM, re.IGNORECASE)
+AYAT = re.compile(r"ayat\s+\((\d+)\)")
+
+# longest range of articles expanded, e.g. "Pasal 5 sampai dengan Pasal 8"
+MAX_RANGE = 200
+
+
+def bill_id(kind: str, number, year):
+    """ Short identifier of a bill, e.g. bill_id("Undang-Undang", 10, 2020) -> "UU 10/2020" """
+
+    kind = " ".join(kind.upper().split())
+    short = next((name for full, name in KINDS if full == kind), kind.title())
+    return f"{short} {number}/{year}"
+
+
+def law_id(match):
+    """ Identifier of the bill cited by a match of LAW """
+
+    if match.group('constitution'):
+        return CONSTITUTION
+    return bill_id(match.group('kind'), int(match.group('number')), int(match.group('year')))
+
+
+def parser_bill_id(parser: RegParser):
+    """ Identifier of a parsed bill, from the kind in its enacting clause and its number and year
+
+    Returns:
+        [str]: identifier, None when the number or year is not found
+    """
+
+    info = parser.info()
+    if info['number'] is None or info['year'] is None:
+        return None
+
+    title = TITLE.findall(parser.header)
+    kind = re.split("TENTANG", title[0], flags=re.IGNORECASE)[0].split(":")[-1] if title else "UNDANG-UNDANG"
+    return bill_id(kind.strip().rstrip(",") or "UNDANG-UNDANG", info['number'], info['year'])
+
+
+def iter_references(text: str, default_bill: str, ayat_pasal: str = None):
+    """ Find the references of a text
+
+    Args:
+        text (str): text of an article
+        default_bill (str): bill of the articles cited without a bill ("Pasal 5 ayat (2)")
+        ayat_pasal (str, optional): article of the ayat cited alone ("pada ayat (1)"). Defaults to None (ignored).
+
+    Yields:
+        [(str, str, int, str)]: (Target bill, Target Pasal or None, Target ayat or None, Matched text)
+    """
+
+    for m in REFERENCE.finditer(text):
+        if not m.group('pasal') and not m.group('law'):
+            continue
+        found = m.group(0).strip()
+        target = law_id(m) if m.group('law') else default_bill
+        if not m.group('pasal'):
+            yield target, None, None, found
+            continue
+
+        previous = None
+        for item in ITEM.finditer(m.group('pasal')):
+            number, ayat = item.group(1), item.group(2)
+            between = m.group('pasal')[previous.end():item.start()] if previous else ""
+            if previous is not None and 'sampai' in between.lower():
+                first, last = pasal_key(previous.group(1))[0] + 1, pasal_key(number)[0]
+                for n in range(first, min(last, first + MAX_RANGE)):
+                    yield target, f"Pasal {n}", None, found
+            yield target, f"Pasal {number.upper()}", int(ayat) if ayat else None, found
+            previous = item
+
+    if ayat_pasal is not None:
+        for m in AYAT_REFERENCE.finditer(text):
+            for ayat in AYAT.finditer(m.group(1)):
+                yield default_bill, ayat_pasal, int(ayat.group(1)), m.group(0)
+
+
+def extract_references(parser: RegParser, bill: str = None):
+    """ Find the references of a parsed bill. References to its own articles are resolved with
+    its StructureIndex; references to other bills are resolved by a ReferenceGraph.
+    The articles of an amending bill (and its amendment instructions) refer to the amended bill.
+
+    Args:
+        parser (RegParser): parsed bill
+        bill (str, optional): identifier of the bill. Defaults to parser_bill_id(parser).
+
+    Returns:
+        [list(Reference)]: references, in document order
+    """
+
+    bill = bill or parser_bill_id(parser) or parser.file
+    default = bill
+    if parser.is_amandement and (m := re.search(LAW, parser.title, re.IGNORECASE)):
+        default = law_id(m)
+
+    references = []
+
+    def add(pasal, found):
+        for target_bill, target_pasal, target_ayat, text in found:
+            if target_bill == bill:
+                resolved = target_pasal is None or parser.index.get_pasal(target_pasal) is not None
+            else:
+                resolved = False
+            references.append(Reference(bill, pasal, target_bill, target_pasal, target_ayat, resolved, text))
+
+    for text, _ in parser.get_legal_consideration():
+        add(None, iter_references(text, bill))
+
+    pasal_roman = None
+    for node in parser.tree.segments:
+        if node.kind == 'pasal_roman':
+            pasal_roman = node.label
+            add(node.label, iter_references(node.text, default))
+        elif node.kind == 'pasal':
+            add(node.label, iter_references(node.text, default, node.label))
+        elif node.kind == 'amendment':
+            add(pasal_roman, iter_references(node.content, default))
+
+    return references
+
+
+def bill_references(file: str, cache: BillCache = None):
+    """ Parse a bill and find its references. Used as the worker function of the process pool.
+
+    Returns:
+        [dict]: {'file', 'bill', 'articles', 'references'}, or {'file', 'error'} when the bill cannot be parsed
+    """
+
+    try:
+        parser = RegParser('', cache=cache)
+        parser.load_pdf(file, '.pdf' in file, parse_now=True)
+        bill = parser_bill_id(parser) or file
+        return {
+            'file': file,
+            'bill': bill,
+            'articles': [node.label for node in parser.tree.segments if node.kind == 'pasal'],
+            'references': [list(ref) for ref in extract_references(parser, bill)],
+        }
+    except Exception as e:
+        return {'file': file, 'error': f"{type(e).__name__}: {e}"}
+
+
+class ReferenceGraph:
+    """ Graph of the references between articles and bills, as adjacency lists.
+        A node is (Bill, Pasal), with Pasal None for a whole bill. Outgoing and incoming references
+        are both indexed, and so are the nodes of each bill, so finding the articles citing an
+        article or a bill is a dictionary access.
+    """
+
+    def __init__(self):
+        self.files = {}         # bill -> file
+        self.articles = {}      # bill -> set of Pasal labels
+        self.outgoing = {}      # (bill, Pasal) -> list of Reference
+        self.incoming = {}      # (target bill, target Pasal) -> list of Reference
+        self.sources = {}       # bill -> (bill, Pasal) keys of outgoing, in document order
+        self.targets = {}       # target bill -> {target Pasal: None} keys of incoming, in order of addition
+
+    def add_bill(self, bill: str, articles, references, file: str = None):
+        """ Add the articles and references of a bill, replacing those added before """
+
+        self.remove_bill(bill)
+        self.files[bill] = file
+        self.articles[bill] = set(articles)
+        sources = self.sources[bill] = {}
+        for ref in references:
+            ref = Reference(*ref)
+            sources[ref.bill, ref.pasal] = None
+            self.outgoing.setdefault((ref.bill, ref.pasal), []).append(ref)
+            self.incoming.setdefault((ref.target_bill, ref.target_pasal), []).append(ref)
+            self.targets.setdefault(ref.target_bill, {})[ref.target_pasal] = None
+
+    def add_parser(self, parser: RegParser):
+        """ Add a parsed bill, resolving its references and the references to it
+
+        Returns:
+            [str]: identifier of the bill
+        """
+
+        bill = parser_bill_id(parser) or parser.file
+        self.add_bill(bill, [node.label for node in parser.tree.segments if node.kind == 'pasal'],
+                      extract_references(parser, bill), parser.file)
+        self.resolve(bill)
+        return bill
+
+    def remove_bill(self, bill: str):
+        """ Remove the articles and references of a bill; references to it become unresolved """
+
+        if bill not in self.articles:
+            return
+        del self.articles[bill]
+        del self.files[bill]
+        for key in self.sources.pop(bill, ()):
+            for ref in self.outgoing.pop(key, []):
+                target = ref.target_bill, ref.target_pasal
+                refs = self.incoming[target]
+                refs.remove(ref)
+                if not refs:
+                    del self.incoming[target]
+                    del self.targets[ref.target_bill][ref.target_pasal]
+                    if not self.targets[ref.target_bill]:
+                        del self.targets[ref.target_bill]
+        self._resolve(self.cited_by(bill))
+
+    def _resolve(self, references):
+        for ref in references:
+            if ref.target_bill == ref.bill:
+                continue
+            articles = self.articles.get(ref.target_bill)
+            resolved = articles is not None and (ref.target_pasal is None or ref.target_pasal in articles)
+            if resolved != ref.resolved:
+                new = ref._replace(resolved=resolved)
+                for refs in (self.outgoing[ref.bill, ref.pasal], self.incoming[ref.target_bill, ref.target_pasal]):
+                    refs[refs.index(ref)] = new
+
+    def resolve(self, bill: str = None):
+        """ Mark references to the bills of the graph as resolved, or unresolved when the cited article does not exist
+
+        Args:
+            bill (str, optional): only resolve the references made by this bill and the references to it. Defaults to None (every reference).
+        """
+
+        if bill is None:
+            self._resolve([ref for refs in self.outgoing.values() for ref in refs])
+        else:
+            self._resolve(self.references(bill) + self.cited_by(bill))
+
+    def references(self, bill: str, pasal: str = None):
+        """ References made by a bill, or by one of its articles
+
+        Returns:
+            [list(Reference)]: references, in document order
+        """
+
+        if pasal is not None:
+            return list(self.outgoing.get((bill, pasal), []))
+        return [ref for key in self.sources.get(bill, ()) for ref in self.outgoing[key]]
+
+    def cited_by(self, bill: str, pasal: str = None, ayat: int = None):
+        """ References to a bill or an article, e.g. cited_by("UU 10/2020", "Pasal 3").
+        Without pasal, references to the bill and to any of its articles are returned.
+
+        Returns:
+            [list(Reference)]: references
+        """
+
+        if pasal is None:
+            return [ref for target in self.targets.get(bill, ()) for ref in self.incoming[bill, target]]
+
+        pasal = f"Pasal {pasal}" if isinstance(pasal, int) or pasal[:1].isdigit() else pasal
+        refs = self.incoming.get((bill, pasal), [])
+        return [ref for ref in refs if ayat is None or ref.target_ayat in (None, ayat)]
+
+    def to_json(self):
+        return {
+            'bills': {bill: {'file': self.files[bill], 'articles': sorted(self.articles[bill], key=pasal_key)} for bill in self.articles},
+            'references': [list(ref) for refs in self.outgoing.values() for ref in refs],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict):
+        graph = cls()
+        references = {}
+        for ref in data['references']:
+            references.setdefault(ref[0], []).append(ref)
+        for bill, values in data['bills'].items():
+            graph.add_bill(bill, values['articles'], references.get(bill, []), values['file'])
+        return graph
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_json(json.load(f))
+
+
+def build_graph(files, workers: int = None, cache: BillCache = None, chunksize: int = 1):
+    """ Build the reference graph of a corpus in one pass over the bills, parsed with a process pool.
+    External references are resolved once every bill has been added.
+
+    Returns:
+        [(ReferenceGraph, list)]: (Graph, list of {'file', 'error'} of the bills that could not be parsed)
+    """
+
+    graph = ReferenceGraph()
+    errors = []
+    with Pool(processes=workers) as pool:
+        for result in pool.imap_unordered(partial(bill_references, cache=cache), files, chunksize=chunksize):
+            if 'error' in result:
+                errors.append(result)
+            else:
+                graph.add_bill(result['bill'], result['articles'], result['references'], result['file'])
+    graph.resolve()
+
+    return graph, errors
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cross-references between articles of Indonesian bills.")
+    commands = ap.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build the reference graph of a corpus")
+    build.add_argument("source", nargs="+", help="directories, glob patterns or PDF files")
+    build.add_argument("-o", "--output", required=True, help="graph file (JSON)")
+    build.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    build.add_argument("--cache", default=None, help="directory of the extraction/parsing cache")
+    build.add_argument("--cache-size", type=int, default=1024, help="maximum cache size in MiB (default: 1024)")
+
+    cited_by = commands.add_parser("cited-by", help="list the references to a bill or an article")
+    cited_by.add_argument("graph", help="graph file (JSON)")
+    cited_by.add_argument("bill", help='bill identifier, e.g. "UU 10/2020"')
+    cited_by.add_argument("--pasal", default=None, help='article, e.g. "Pasal 3"')
+
+    args = ap.parse_args(argv)
+
+    if args.command == "build":
+        files = [f for source in args.source for f in (find_bills(source) if not os.path.isfile(source) else [source])]
+        cache = BillCache(args.cache, max_size=args.cache_size << 20) if args.cache else None
+        graph, errors = build_graph(files, args.workers, cache)
+        graph.save(args.output)
+        for error in errors:
+            print(f"{error['file']}: {error['error']}", file=sys.stderr)
+        print(f"{len(graph.articles)} bills, {sum(map(len, graph.outgoing.values()))} references", file=sys.stderr)
+        return 1 if errors else 0
+
+    graph = ReferenceGraph.load(args.graph)
+    for ref in graph.cited_by(args.bill, args.pasal):
+        ayat = f" ayat ({ref.target_ayat})" if ref.target_ayat else ""
+        print(f"{ref.bill}\t{ref.pasal or ''}\t{ref.target_pasal or ''}{ayat}\t{ref.text}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
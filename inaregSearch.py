@@ -0,0 +1,455 @@
+""" Full-text search over the articles (Pasal) of a corpus of bills, ranked with BM25.
+
+    python inaregSearch.py add index/ sample/             # parse and index the bills of a folder
+    python inaregSearch.py search index/ "retribusi parkir"
+    python inaregSearch.py remove index/ sample/pnbp.pdf
+    python inaregSearch.py merge index/                   # rewrite the segments without removed bills
+"""
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import sys
+import tempfile
+from array import array
+from collections import Counter, namedtuple
+from functools import partial
+from multiprocessing import Pool
+
+from inaregCache import BillCache
+from inaregCorpus import find_bills
+from inaregParser import RegParser
+from inaregWords import load_stopwords, terms
+
+# one search result; score is the BM25 score of the article
+Hit = namedtuple("Hit", ["bill", "pasal", "score", "snippet"])
+
+MANIFEST = "index.json"
+
+
+def article_terms(text: str):
+    return terms(text, load_stopwords())
+
+
+def bill_articles(file: str, cache: BillCache = None):
+    """ Parse a bill and list its articles. Used as the worker function of the process pool.
+
+    Returns:
+        [(str, list)]: (File, list of (Pasal, Text)), None instead of the list when the bill
+            cannot be parsed, so the version already indexed is kept (see SearchIndex.add)
+    """
+
+    try:
+        parser = RegParser('', cache=cache)
+        parser.load_pdf(file, '.pdf' in file, parse_now=True)
+        return file, [(node.label, node.text.strip()) for node in parser.iter_articles()]
+    except Exception as e:
+        print(f"{file}: {type(e).__name__}: {e}", file=sys.stderr)
+        return file, None
+
+
+def _map(path: str, typecode: str):
+    """ Memory-map an array file written with array.tofile
+
+    Returns:
+        [(mmap, memoryview)]: (Map, Array view), (None, empty array) for an empty file
+    """
+
+    if os.path.getsize(path) == 0:
+        return None, array(typecode)
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, memoryview(mm).cast(typecode)
+
+
+class Segment:
+    """ An immutable part of the index, written by one call of SearchIndex.add.
+        Postings of a term are a slice of two uint32 arrays (article ids, term frequencies);
+        arrays and article texts are memory-mapped, only the term dictionary is loaded.
+
+        docs.json       bills, and (bill number, Pasal) of every article
+        terms.json      term -> (first posting, number of postings)
+        postings.bin    article ids, grouped by term
+        freqs.bin       term frequencies, parallel to postings.bin
+        lengths.bin     number of terms of every article
+        offsets.bin     byte offsets of the article texts in texts.bin
+        texts.bin       UTF-8 article texts, for snippets
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'docs.json'), 'r', encoding='utf-8') as f:
+            docs = json.load(f)
+        self.bills = docs['bills']
+        self.docs = docs['docs']
+        with open(os.path.join(path, 'terms.json'), 'r', encoding='utf-8') as f:
+            self.terms = json.load(f)
+
+        self._maps = []
+        self.postings = self._map('postings.bin', 'I')
+        self.freqs = self._map('freqs.bin', 'I')
+        self.lengths = self._map('lengths.bin', 'I')
+        self.offsets = self._map('offsets.bin', 'Q')
+        self.texts = self._map('texts.bin', 'B')
+
+    def _map(self, name, typecode):
+        mm, view = _map(os.path.join(self.path, name), typecode)
+        if mm is not None:
+            self._maps.append((mm, view))
+        return view
+
+    def close(self):
+        for mm, view in self._maps:
+            view.release()
+            mm.close()
+        self._maps = []
+
+    @staticmethod
+    def write(path: str, bills):
+        """ Write a segment
+
+        Args:
+            path (str): segment directory, created if missing
+            bills (iterable): (File, list of (Pasal, Text)) of every bill
+        """
+
+        names, docs = [], []
+        postings = {}
+        lengths, offsets = array('I'), array('Q', [0])
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'texts.bin'), 'wb') as f:
+            for file, articles in bills:
+                for pasal, text in articles:
+                    counts = Counter(article_terms(text))
+                    for term, tf in counts.items():
+                        postings.setdefault(term, []).append((len(docs), tf))
+                    docs.append((len(names), pasal))
+                    lengths.append(sum(counts.values()))
+                    data = text.encode('utf-8')
+                    f.write(data)
+                    offsets.append(offsets[-1] + len(data))
+                names.append(file)
+
+        terms, ids, freqs = {}, array('I'), array('I')
+        for term in sorted(postings):
+            terms[term] = (len(ids), len(postings[term]))
+            for doc, tf in postings[term]:
+                ids.append(doc)
+                freqs.append(tf)
+
+        for name, values in [('postings.bin', ids), ('freqs.bin', freqs), ('lengths.bin', lengths), ('offsets.bin', offsets)]:
+            with open(os.path.join(path, name), 'wb') as f:
+                values.tofile(f)
+        with open(os.path.join(path, 'terms.json'), 'w', encoding='utf-8') as f:
+            json.dump(terms, f, ensure_ascii=False)
+        with open(os.path.join(path, 'docs.json'), 'w', encoding='utf-8') as f:
+            json.dump({'bills': names, 'docs': docs}, f, ensure_ascii=False)
+
+    def text(self, doc: int):
+        return bytes(self.texts[self.offsets[doc]:self.offsets[doc + 1]]).decode('utf-8')
+
+    def iter_bills(self, deleted=()):
+        """ Articles of the bills of the segment, skipping deleted bills
+
+        Yields:
+            [(str, list)]: (File, list of (Pasal, Text))
+        """
+
+        articles = [[] for _ in self.bills]
+        for doc, (bill, pasal) in enumerate(self.docs):
+            articles[bill].append((pasal, self.text(doc)))
+        for bill, file in enumerate(self.bills):
+            if file not in deleted:
+                yield file, articles[bill]
+
+
+class SearchIndex:
+    """ Persistent inverted index of the articles of a corpus, ranked with BM25.
+        Bills are added in segments, so adding bills never rewrites the existing postings.
+        Removed bills are only marked as deleted until the segments are merged.
+        The list of segments and deleted bills is kept in index.json, replaced atomically.
+    """
+
+    def __init__(self, directory: str, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            directory (str): index directory, created if missing
+            k1 (float, optional): BM25 term frequency saturation. Defaults to 1.2.
+            b (float, optional): BM25 length normalization. Defaults to 0.75.
+        """
+
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        os.makedirs(directory, exist_ok=True)
+
+        self.manifest = {'next': 0, 'segments': []}
+        path = os.path.join(directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+        self.segments = []
+        self._open()
+
+    def _open(self):
+        self.close()
+        self.segments = [Segment(os.path.join(self.directory, entry['name'])) for entry in self.manifest['segments']]
+        self._stats()
+
+    def _stats(self):
+        """ Articles of deleted bills in every segment, number of live articles and their average length """
+
+        self.deleted = []
+        self.documents, total = 0, 0
+        for segment, entry in zip(self.segments, self.manifest['segments']):
+            deleted = set(entry['deleted'])
+            dead = {doc for doc, (bill, _) in enumerate(segment.docs) if segment.bills[bill] in deleted}
+            self.deleted.append(dead)
+            self.documents += len(segment.docs) - len(dead)
+            total += sum(segment.lengths) - sum(segment.lengths[doc] for doc in dead)
+
+        self.average_length = total / self.documents if self.documents else 0.0
+
+    def _save(self):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, os.path.join(self.directory, MANIFEST))
+
+    def _write_segment(self, bills):
+        """ Write a new segment and return its name. The segment is written in a temporary
+        directory moved into place once complete; names left on disk by an interrupted add are skipped.
+        """
+
+        while os.path.exists(os.path.join(self.directory, f"segment-{self.manifest['next']:06d}")):
+            self.manifest['next'] += 1
+        name = f"segment-{self.manifest['next']:06d}"
+
+        tmp = tempfile.mkdtemp(dir=self.directory, suffix=".tmp")
+        try:
+            Segment.write(tmp, bills)
+            os.replace(tmp, os.path.join(self.directory, name))
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.manifest['next'] += 1
+
+        return name
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def bills(self):
+        """ Indexed bills
+
+        Returns:
+            [list]: filenames
+        """
+
+        return [file for segment, entry in zip(self.segments, self.manifest['segments'])
+                for file in segment.bills if file not in entry['deleted']]
+
+    def __len__(self):
+        return self.documents
+
+    def add(self, bills):
+        """ Index bills in a new segment; a bill already in the index is replaced.
+        Bills that could not be parsed (None instead of their articles) are skipped.
+
+        Args:
+            bills (iterable): (File, list of (Pasal, Text)) of every bill, see bill_articles
+
+        Returns:
+            [int]: number of bills added
+        """
+
+        bills = [(file, articles) for file, articles in bills if articles is not None]
+        if not bills:
+            return 0
+
+        self.remove([file for file, _ in bills], save=False)
+        name = self._write_segment(bills)
+        self.manifest['segments'].append({'name': name, 'deleted': []})
+        self._save()
+        self._open()
+
+        return len(bills)
+
+    def add_parser(self, parser: RegParser):
+        """ Index a parsed bill """
+
+        return self.add([(parser.file, [(node.label, node.text.strip()) for node in parser.iter_articles()])])
+
+    def add_files(self, files, workers: int = None, cache: BillCache = None, batch: int = 256):
+        """ Parse and index bills with a process pool, writing a segment every `batch` bills
+
+        Returns:
+            [int]: number of bills added
+        """
+
+        added = 0
+        with Pool(processes=workers) as pool:
+            bills = []
+            for file, articles in pool.imap_unordered(partial(bill_articles, cache=cache), files):
+                bills.append((file, articles))
+                if len(bills) >= batch:
+                    added += self.add(bills)
+                    bills = []
+            added += self.add(bills)
+
+        return added
+
+    def remove(self, files, save: bool = True):
+        """ Mark bills as deleted; their postings are dropped by the next merge
+
+        Returns:
+            [int]: number of bills removed
+        """
+
+        files = set(files)
+        removed = 0
+        for segment, entry in zip(self.segments, self.manifest['segments']):
+            found = files.intersection(segment.bills).difference(entry['deleted'])
+            entry['deleted'].extend(sorted(found))
+            removed += len(found)
+
+        if save and removed:
+            self._save()
+            self._stats()
+
+        return removed
+
+    def merge(self):
+        """ Rewrite all segments as a single one, without the deleted bills and unused segment directories """
+
+        bills = [bill for segment, entry in zip(self.segments, self.manifest['segments'])
+                 for bill in segment.iter_bills(set(entry['deleted']))]
+        old = [entry['name'] for entry in self.manifest['segments']]
+
+        self.manifest['segments'] = []
+        if bills:
+            name = self._write_segment(bills)
+            self.manifest['segments'].append({'name': name, 'deleted': []})
+        self._save()
+        self._open()
+
+        # the replaced segments, and the directories left by interrupted writes
+        live = {entry['name'] for entry in self.manifest['segments']}
+        for name in os.listdir(self.directory):
+            if name not in live and (name in old or name.startswith("segment-") or name.endswith(".tmp")):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def search(self, query: str, n: int = 10, snippet: int = 160):
+        """ Find the articles matching a query, ranked with BM25
+
+        Args:
+            query (str): words, tokenized like the articles
+            n (int, optional): maximum number of results. Defaults to 10.
+            snippet (int, optional): length of the snippets in characters. Defaults to 160.
+
+        Returns:
+            [list(Hit)]: best articles first
+        """
+
+        words = list(dict.fromkeys(article_terms(query)))
+        scores = Counter()
+        for word in words:
+            matches = []
+            for i, segment in enumerate(self.segments):
+                if word not in segment.terms:
+                    continue
+                first, count = segment.terms[word]
+                dead = self.deleted[i]
+                for doc, tf in zip(segment.postings[first:first + count], segment.freqs[first:first + count]):
+                    if doc not in dead:
+                        matches.append((i, doc, tf))
+            if not matches:
+                continue
+
+            average = self.average_length or 1.0   # every live article is empty
+            idf = math.log(1 + (self.documents - len(matches) + 0.5) / (len(matches) + 0.5))
+            for i, doc, tf in matches:
+                norm = self.k1 * (1 - self.b + self.b * self.segments[i].lengths[doc] / average)
+                scores[i, doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        hits = []
+        for (i, doc), score in heapq.nlargest(n, scores.items(), key=lambda x: x[1]):
+            segment = self.segments[i]
+            bill, pasal = segment.docs[doc]
+            hits.append(Hit(segment.bills[bill], pasal, score, make_snippet(segment.text(doc), words, snippet)))
+
+        return hits
+
+
+def make_snippet(text: str, words, length: int = 160):
+    """ Part of a text around the first occurence of one of the words """
+
+    text = ' '.join(text.split())
+    m = re.search(r"\b(" + "|".join(re.escape(w) for w in words) + r")\b", text, re.IGNORECASE) if words else None
+    start = max(0, m.start() - length // 3) if m else 0
+    if start > 0:
+        start = text.find(' ', start) + 1 or start
+    end = min(len(text), start + length)
+    if end < len(text):
+        end = text.rfind(' ', start, end) if text.rfind(' ', start, end) > start else end
+
+    return ("..." if start > 0 else "") + text[start:end] + ("..." if end < len(text) else "")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Full-text search over the articles of Indonesian bills.")
+    commands = ap.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="parse and index bills")
+    add.add_argument("index", help="index directory")
+    add.add_argument("source", nargs="+", help="directories, glob patterns or PDF files")
+    add.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    add.add_argument("--cache", default=None, help="directory of the extraction/parsing cache")
+    add.add_argument("--cache-size", type=int, default=1024, help="maximum cache size in MiB (default: 1024)")
+
+    remove = commands.add_parser("remove", help="remove bills from the index")
+    remove.add_argument("index", help="index directory")
+    remove.add_argument("files", nargs="+", help="filenames of the bills, as they were added")
+
+    merge = commands.add_parser("merge", help="merge the segments, dropping removed bills")
+    merge.add_argument("index", help="index directory")
+
+    search = commands.add_parser("search", help="search the articles")
+    search.add_argument("index", help="index directory")
+    search.add_argument("query", help="words to search")
+    search.add_argument("-n", type=int, default=10, help="number of results (default: 10)")
+
+    args = ap.parse_args(argv)
+
+    with SearchIndex(args.index) as index:
+        if args.command == "add":
+            files = [f for source in args.source for f in (find_bills(source) if not os.path.isfile(source) else [source])]
+            cache = BillCache(args.cache, max_size=args.cache_size << 20) if args.cache else None
+            print(f"{index.add_files(files, args.workers, cache)} bills indexed", file=sys.stderr)
+        elif args.command == "remove":
+            print(f"{index.remove(args.files)} bills removed", file=sys.stderr)
+        elif args.command == "merge":
+            index.merge()
+            print(f"{len(index.segments)} segments, {len(index)} articles", file=sys.stderr)
+        elif args.command == "search":
+            for hit in index.search(args.query, args.n):
+                print(f"{hit.score:7.2f}  {hit.bill}  {hit.pasal}\n         {hit.snippet}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
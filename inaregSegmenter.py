@@ -0,0 +1,602 @@
+import re
+import sys
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from itertools import chain
+
+# nesting level of each section kind, lower levels contain higher ones
+LEVELS = {
+    'root': -1,
+    'pasal_roman': 0,   # Pasal I, Pasal II of an amending bill
+    'amendment': 1,     # $AmmendedItem=> amendment instruction
+    'bab': 2,
+    'bagian': 3,
+    'paragraf': 4,
+    'pasal': 5,
+    'ayat': 6,
+    'unknown': 7,
+}
+
+AMENDMENT_LABEL = "$AmmendedItem=>"
+
+# keyword starting a section; only the keyword is consumed, so an amendment instruction
+# can still start right after it. A marker must also start a word (see Segmenter.is_marker)
+HEADING_MARKERS = r"BAB(?=\s.)|Bagian(?=\s+Ke.)|Paragraf(?=\s+\d)|Pasal(?=\s\d)"
+AMENDMENT_MARKERS = r"Pasal(?=\sI+\s)"
+
+# amendment instruction: a change or insertion up to "berbunyi sebagai berikut", a deletion of articles
+# or ayat ("Ketentuan ayat (3) Pasal 2 dihapus", "Ketentuan Pasal 1 sampai dengan Pasal 3 dihapus"),
+# or an article only changed in the elucidation
+AMENDMENT_ITEM = r"""(?:\d+\.\s{0,3}(?:Judul|Ketentuan|Di\s+antara).+?berbunyi\s+sebagai\s+berikut\s?:)|(?:\d+\.\s{0,3}Ketentuan\s(?:ayat\s\(\w+\)\s(?:(?:dan|sampai\sdengan)\sayat\s\(\w+\)\s)?)?Pasal\s\w+(?:\s(?:dan|sampai\sdengan)\sPasal\s\w+)?(?:\sayat\s\(\w+\)(?:\s(?:dan|sampai\sdengan)\sayat\s\(\w+\))?)?\sdihapus)|(?:\d+\.\s{0,3}Pasal\s).+?(?:(?:tercantum|ditetapkan)\s+dalam\s+penjelasan(?:\s+pasal\s+demi\s+pasal\s+(?:[Uu]ndang-[Uu]ndang\s+ini)?)?\.?)"""
+
+# section id at the beginning of a section, in order of priority
+LABELS = [
+    ('pasal_roman', re.compile(r"Pasal\sI+(?=\s)")),
+    ('bab', re.compile(r"BAB\s[A-Z]+(?=\s)")),
+    ('bagian', re.compile(r"Bagian\sKe\w+(?=\s)")),
+    ('paragraf', re.compile(r"Paragraf\s\d+(?=\s)")),
+]
+PASAL_LABEL = re.compile(r"Pasal\s\d+(?=\s)")
+AMENDED_PASAL_LABEL = re.compile(r"\"?Pasal\s\d+[A-Z]?(?=\s)")
+
+# number and amendment suffix of an article reference, e.g. "Pasal 27A" or "27a"
+PASAL_REF = re.compile(r"(?:Pasal\s+)?(\d+)\s*([A-Za-z]?)\b", re.IGNORECASE)
+ROMAN_REF = re.compile(r"(?:(?:BAB|Pasal)\s+)?([IVXLCDM]+)([A-Z]?)\b")
+ROMANS = [(1000, 'M'), (900, 'CM'), (500, 'D'), (400, 'CD'), (100, 'C'), (90, 'XC'),
+          (50, 'L'), (40, 'XL'), (10, 'X'), (9, 'IX'), (5, 'V'), (4, 'IV'), (1, 'I')]
+
+AYAT_MARKER = re.compile(r"\((\d+)\)(?=\s)")
+SPACES = re.compile(r"\s*")
+
+# characters needed after a marker before it can be accepted while streaming; an amendment
+# instruction is matched up to "berbunyi sebagai berikut", so it needs a larger window
+LOOKAHEAD = 64
+AMENDMENT_LOOKAHEAD = 4096
+
+# sections an incremental update can rescan from, see Segmenter.update
+ANCHORS = ('bab', 'pasal', 'pasal_roman')
+
+
+class Section:
+    """ A node of the document tree.
+        Offsets refer to the text of the tree, so no text is copied until requested.
+    """
+
+    __slots__ = ('tree', 'kind', 'label', 'start', 'end', 'text_start', 'parent', '_children')
+
+    def __init__(self, tree, kind: str, label: str, start: int, end: int, text_start: int = None):
+        self.tree = tree
+        self.kind = kind
+        self.label = label
+        self.start = start
+        self.end = end
+        self.text_start = start if text_start is None else text_start
+        self.parent = None
+        self._children = None
+
+    @property
+    def level(self):
+        return LEVELS[self.kind]
+
+    @property
+    def content(self):
+        """ Full text of the section, including its id """
+
+        return self.tree.text[self.start:self.end]
+
+    @property
+    def text(self):
+        """ Text of the section after its id """
+
+        return self.tree.text[self.text_start:self.end]
+
+    @property
+    def children(self):
+        """ Child sections; the ayat of a Pasal are only split when first requested """
+
+        if self._children is None:
+            self._children = []
+            if self.kind == 'pasal':
+                split_ayat(self)
+        return self._children
+
+    def add(self, child):
+        child.parent = self
+        self.children.append(child)
+        return child
+
+    def walk(self):
+        """ Iterate over this section and all its descendants in document order """
+
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def ancestors(self):
+        """ Iterate over the enclosing sections, nearest first """
+
+        node = self.parent
+        while node is not None and node.kind != 'root':
+            yield node
+            node = node.parent
+
+    def context(self):
+        """ Labels of the enclosing sections by kind, e.g. {'bab': 'BAB I', 'bagian': 'Bagian Kesatu'} """
+
+        return {node.kind: node.label for node in self.ancestors()}
+
+    def __repr__(self):
+        return f"Section({self.kind!r}, {self.label!r}, {self.start}, {self.end})"
+
+
+def to_roman(number: int):
+    result = ''
+    for value, numeral in ROMANS:
+        while number >= value:
+            result += numeral
+            number -= value
+    return result
+
+
+def pasal_key(ref):
+    """ Key of an article reference: "Pasal 27A", "27A" or 27 -> (27, 'A')
+
+    Returns:
+        [(int, str)]: (Number, Amendment suffix), None if `ref` is not an article reference
+    """
+
+    if isinstance(ref, int):
+        return (ref, '')
+    if m := PASAL_REF.search(ref):
+        return (int(m.group(1)), m.group(2).upper())
+    return None
+
+
+def roman_key(ref):
+    """ Key of a BAB or Pasal I/II reference: "BAB V", "V" or 5 -> 'V', "BAB IIA" -> 'IIA' """
+
+    if isinstance(ref, int):
+        return to_roman(ref)
+    if m := ROMAN_REF.match(ref.strip().lstrip('"')):
+        return m.group(1) + m.group(2)
+    return None
+
+
+class StructureIndex:
+    """ Lookup of the sections of a document tree by number.
+        Articles are indexed by number and amendment suffix (27, 27A), BAB by roman numeral and
+        Bagian by their BAB; every lookup is a dictionary access and range queries use bisection.
+        An amending bill can contain several articles with the same number, all are kept.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.pasal = {}
+        self.pasal_roman = {}
+        self.bab = {}
+        self.bagian = {}
+        for node in tree.segments:
+            if node.kind == 'pasal':
+                self.pasal.setdefault(pasal_key(node.label), []).append(node)
+            elif node.kind == 'pasal_roman':
+                self.pasal_roman.setdefault(roman_key(node.label), []).append(node)
+            elif node.kind == 'bab':
+                self.bab.setdefault(roman_key(node.label), node)
+            elif node.kind == 'bagian':
+                bab = next((a for a in node.ancestors() if a.kind == 'bab'), None)
+                self.bagian.setdefault((roman_key(bab.label) if bab else None, node.label.lower()), node)
+
+        self.keys = sorted(self.pasal)
+
+    def get_pasal(self, ref):
+        """ Find an article, e.g. get_pasal("Pasal 27A"), get_pasal("27A") or get_pasal(27)
+
+        Returns:
+            [Section]: first article with this number, None if not found
+        """
+
+        found = self.pasal.get(pasal_key(ref))
+        return found[0] if found else None
+
+    def get_pasals(self, ref):
+        """ Every article with this number (an amending bill can repeat numbers)
+
+        Returns:
+            [list(Section)]: articles, in document order
+        """
+
+        return list(self.pasal.get(pasal_key(ref), []))
+
+    def get_pasal_roman(self, ref):
+        """ Find a Pasal I/II of an amending bill """
+
+        found = self.pasal_roman.get(roman_key(ref), [])
+        return found[0] if found else None
+
+    def get_bab(self, ref):
+        """ Find a BAB, e.g. get_bab("BAB V"), get_bab("V") or get_bab(5) """
+
+        return self.bab.get(roman_key(ref))
+
+    def get_bagian(self, bab, bagian: str):
+        """ Find a Bagian of a BAB, e.g. get_bagian("BAB II", "Bagian Kedua"); bab is None when
+        the bill has no BAB """
+
+        return self.bagian.get((roman_key(bab) if bab is not None else None, bagian.lower()))
+
+    def pasal_range(self, start, end):
+        """ Articles from `start` to `end` inclusive, e.g. pasal_range(10, 20) or pasal_range("27", "27C").
+        An article number without suffix also includes the inserted articles after it (20 includes 20A).
+
+        Returns:
+            [list(Section)]: articles, in order of number
+        """
+
+        start, end = pasal_key(start), pasal_key(end)
+        if not end[1]:
+            end = (end[0], '\uffff')
+        first, last = bisect_left(self.keys, start), bisect_right(self.keys, end)
+
+        return [node for key in self.keys[first:last] for node in self.pasal[key]]
+
+    def articles(self, section):
+        """ Articles inside a section (e.g. a BAB or Bagian), in document order """
+
+        return [node for node in section.walk() if node.kind == 'pasal']
+
+    def enclosing(self, node, kind: str):
+        """ Nearest enclosing section of a kind, e.g. enclosing(pasal, 'bab') """
+
+        return next((a for a in node.ancestors() if a.kind == kind), None)
+
+
+def common_prefix(a: str, b: str, block: int = 4096):
+    """ Length of the common prefix of two texts, compared by blocks """
+
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i:i + block] == b[i:i + block]:
+        i += block
+    i = min(i, n)
+    end = min(i + block, n)
+    while i < end and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def common_suffix(a: str, b: str, limit: int, block: int = 4096):
+    """ Length of the common suffix of two texts, at most `limit` """
+
+    i = 0
+    while i < limit:
+        step = min(block, limit - i)
+        if a[len(a) - i - step:len(a) - i] != b[len(b) - i - step:len(b) - i]:
+            break
+        i += step
+    while i < limit and a[len(a) - i - 1] == b[len(b) - i - 1]:
+        i += 1
+    return i
+
+
+def split_ayat(pasal: Section):
+    """ Add the ayat (numbered paragraphs) of a Pasal as its children """
+
+    text = pasal.tree.text
+    expected = 1
+    starts = []
+    for m in AYAT_MARKER.finditer(text, pasal.text_start, pasal.end):
+        # skip references such as "ayat (1)"
+        if not text[m.start() - 1].isspace() or text.endswith('ayat', 0, m.start() - 1):
+            continue
+        if int(m.group(1)) == expected:
+            starts.append((m.start(), sys.intern(m.group(0))))
+            expected += 1
+
+    for i, (start, label) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else pasal.end
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        pasal.add(Section(pasal.tree, 'ayat', label, start, end, start + len(label)))
+
+
+class SectionTexts(Sequence):
+    """ Read-only list of segments as [Section Title, Text].
+        Items are made from the offsets of the segments when they are read, so the texts of all
+        sections are never held in memory at once.
+    """
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [[node.label, node.text.strip()] for node in self.segments[i]]
+        node = self.segments[i]
+        return [node.label, node.text.strip()]
+
+    def __eq__(self, other):
+        return isinstance(other, (Sequence)) and len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class DocumentTree:
+    """ Hierarchy of a bill body: BAB -> Bagian -> Paragraf -> Pasal -> ayat """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.root = Section(self, 'root', '', 0, len(text))
+        self.segments = []
+        self._index = None
+
+    @property
+    def index(self):
+        """ StructureIndex of the tree, built on first use """
+
+        if self._index is None:
+            self._index = StructureIndex(self)
+        return self._index
+
+    def sections(self, kind: str = None):
+        """ Iterate over sections in document order, optionally only of one kind """
+
+        for node in self.root.walk():
+            if node.kind != 'root' and (kind is None or node.kind == kind):
+                yield node
+
+    def offsets(self):
+        """ Offsets of the segments, enough to rebuild the tree with Segmenter.build
+
+        Returns:
+            [list]: [Start, End, Is amendment instruction] of each segment
+        """
+
+        return [[node.start, node.end, node.kind == 'amendment'] for node in self.segments]
+
+    @property
+    def parsed_text(self):
+        """ Segments as [Section Title, Text], the format of RegParser.parsed_text, made on request """
+
+        return SectionTexts(self.segments)
+
+
+class Segmenter:
+    """ Single-pass segmentation of a bill body.
+        Every heading marker (BAB, Bagian, Paragraf, Pasal and, for amending bills,
+        Pasal I/II and amendment instructions) is found by one scan of the body;
+        the text between two markers is a segment.
+    """
+
+    def __init__(self, is_amandement: bool = False):
+        self.is_amandement = is_amandement
+
+        markers = HEADING_MARKERS
+        if is_amandement:
+            markers = "|".join([AMENDMENT_ITEM, AMENDMENT_MARKERS, markers])
+        self.pattern = re.compile(markers)
+        self.labels = LABELS + [('pasal', AMENDED_PASAL_LABEL if is_amandement else PASAL_LABEL)]
+
+    def iter_segments(self, text: str, start: int = 0):
+        """ Find segments of the body
+
+        Args:
+            text (str): bill body
+            start (int, optional): offset of the first segment, which must be the start of a segment. Defaults to 0.
+
+        Yields:
+            [(int, int, bool)]: (Start, End, Is amendment instruction) with surrounding whitespace excluded
+        """
+
+        last = start
+        for m in self.pattern.finditer(text, start):
+            # amendment instructions start with their number
+            is_item = text[m.start()].isdigit()
+            if not is_item and not self.is_marker(text, m.start(), m.end()):
+                continue
+            if m.start() > last:
+                yield from self._strip(text, last, m.start(), False)
+            if is_item:
+                yield from self._strip(text, m.start(), m.end(), True)
+                last = m.end()
+            else:
+                last = m.start()
+
+        yield from self._strip(text, last, len(text), False)
+
+    @staticmethod
+    def is_marker(text: str, start: int, end: int):
+        """ Check that a heading keyword starts a word; an article id must also follow a
+        whitespace and not be a reference ("dalam Pasal 5") """
+
+        if text[start:end] == 'Pasal' and text[end + 1].isdigit():
+            return start > 0 and text[start - 1].isspace() and not text.endswith('dalam', 0, start - 1)
+
+        return start == 0 or text[start - 1].isspace()
+
+    def _strip(self, text, start, end, is_item):
+        start = SPACES.match(text, start, end).end()
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            yield (start, end, is_item)
+
+    def classify(self, tree, start: int, end: int, is_item: bool = False):
+        """ Create the section of a segment from its id """
+
+        if is_item:
+            return Section(tree, 'amendment', AMENDMENT_LABEL, start, end)
+
+        for kind, pattern in self.labels:
+            if m := pattern.match(tree.text, start, end):
+                return Section(tree, kind, m.group(0), start, end, m.end())
+
+        return Section(tree, 'unknown', 'Unknown', start, end)
+
+    def iter_sections(self, chunks, lookahead: int = None):
+        """ Segment a bill body read as successive pieces of text (e.g. page by page).
+        Each section is yielded as soon as the next one starts, with `parent` set to its
+        enclosing section. Sections are not added to the children of their parent and only
+        the text of the current section is kept, so memory does not grow with the bill.
+
+        Args:
+            chunks (iterable): pieces of the body text
+            lookahead (int, optional): characters read after a marker before it is accepted.
+                Defaults to LOOKAHEAD, or AMENDMENT_LOOKAHEAD for an amending bill.
+
+        Yields:
+            [Section]: sections in document order, the same segments as `segment`
+        """
+
+        if lookahead is None:
+            lookahead = AMENDMENT_LOOKAHEAD if self.is_amandement else LOOKAHEAD
+
+        stack = [DocumentTree('').root]
+        text, scan, last = '', 0, 0
+        for chunk in chain(chunks, [None]):
+            final = chunk is None
+            if not final:
+                text += chunk
+                if len(text) - scan <= lookahead:
+                    continue
+
+            limit = len(text) if final else len(text) - lookahead
+            segments = []
+            for m in self.pattern.finditer(text, scan):
+                if not final and m.end() > limit:
+                    break
+                scan = m.end()
+                # amendment instructions start with their number
+                is_item = text[m.start()].isdigit()
+                if not is_item and not self.is_marker(text, m.start(), m.end()):
+                    continue
+                if m.start() > last:
+                    segments.extend(self._strip(text, last, m.start(), False))
+                if is_item:
+                    segments.extend(self._strip(text, m.start(), m.end(), True))
+                    last = m.end()
+                else:
+                    last = m.start()
+
+            if final:
+                segments.extend(self._strip(text, last, len(text), False))
+
+            for start, end, is_item in segments:
+                node = self.classify(DocumentTree(text[start:end]), 0, end - start, is_item)
+                if node.kind != 'unknown':
+                    while stack[-1].level >= node.level:
+                        stack.pop()
+                node.parent = stack[-1]
+                if node.kind != 'unknown':
+                    stack.append(node)
+                yield node
+
+            # keep the current section, and a few characters before the scan position for is_marker
+            keep = max(0, min(last, scan - 16))
+            text, scan, last = text[keep:], scan - keep, last - keep
+
+    def segment(self, text: str):
+        """ Build the document tree of a bill body
+
+        Returns:
+            [DocumentTree]: document tree
+        """
+
+        return self.build(text, self.iter_segments(text))
+
+    def update(self, tree: DocumentTree, text: str):
+        """ Segment a new version of a text, rescanning only the part that changed.
+        The scan starts at the BAB or Pasal before the first changed character and stops at the
+        first section after the last changed character that also starts a section of the old
+        tree; the other segments are taken from the old tree.
+
+        Args:
+            tree (DocumentTree): tree of the previous version
+            text (str): new version of the text
+
+        Returns:
+            [(DocumentTree, list, list, list)]: (New tree, Added sections, Removed sections of the old tree,
+                Changed sections), sections with a new label, without a label in the new version,
+                and with the same label but another text
+        """
+
+        old, segments = tree.text, tree.segments
+        prefix = common_prefix(old, text)
+        if prefix == len(old) == len(text):
+            return self.build(text, tree.offsets()), [], [], []
+
+        suffix = common_suffix(old, text, min(len(old), len(text)) - prefix)
+        delta = len(text) - len(old)
+        changed_end = len(text) - suffix
+        lookahead = AMENDMENT_LOOKAHEAD if self.is_amandement else LOOKAHEAD
+
+        # first rescanned segment: the last anchor starting well before the change
+        first = bisect_right([node.start for node in segments], prefix - lookahead) - 1
+        while first > 0 and segments[first].kind not in ANCHORS:
+            first -= 1
+        first = max(first, 0)
+        start = segments[first].start if first > 0 else 0
+
+        starts = {node.start: i for i, node in enumerate(segments)}
+        rescanned, resume = [], len(segments)
+        for segment in self.iter_segments(text, start):
+            if segment[0] >= changed_end + LOOKAHEAD and segment[0] - delta in starts:
+                resume = starts[segment[0] - delta]
+                break
+            rescanned.append(segment)
+
+        new = self.build(text, chain(tree.offsets()[:first], rescanned,
+                                     ([s + delta, e + delta, item] for s, e, item in tree.offsets()[resume:])))
+
+        # compare the rescanned sections with the old sections they replace
+        before = {}
+        for node in segments[first:resume]:
+            before.setdefault(node.label, []).append(node)
+        added, changed = [], []
+        for node in new.segments[first:first + len(rescanned)]:
+            candidates = before.get(node.label)
+            if not candidates:
+                added.append(node)
+                continue
+            same = next((i for i, other in enumerate(candidates) if other.content == node.content), None)
+            if same is None:
+                candidates.pop(0)
+                changed.append(node)
+            else:
+                candidates.pop(same)
+        removed = sorted((node for nodes in before.values() for node in nodes), key=lambda node: node.start)
+
+        return new, added, removed, changed
+
+    def build(self, text: str, segments):
+        """ Build the document tree from known segment offsets
+
+        Args:
+            text (str): bill body
+            segments (iterable): (Start, End, Is amendment instruction) of each segment
+
+        Returns:
+            [DocumentTree]: document tree
+        """
+
+        tree = DocumentTree(text)
+        stack = [tree.root]
+        for start, end, is_item in segments:
+            node = self.classify(tree, start, end, is_item)
+            tree.segments.append(node)
+
+            if node.kind == 'unknown':
+                stack[-1].add(node)
+                continue
+
+            while stack[-1].level >= node.level:
+                stack.pop()
+            stack[-1].add(node)
+            stack.append(node)
+
+        return tree
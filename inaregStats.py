@@ -0,0 +1,135 @@
+import functools
+import inspect
+import time
+from collections import namedtuple
+
+# one call of a parser stage; time in seconds, sizes in characters (or bytes for a PDF)
+Stage = namedtuple("Stage", ["bill", "name", "time", "input_size", "output_count"])
+
+
+class ParseStats:
+    """ Collects the stage measurements of one or many parsed bills.
+        An instance is a stage callback, so it can be given wherever a callback is expected.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    def __call__(self, stage: Stage):
+        self.stages.append(stage)
+
+    def __iter__(self):
+        return iter(self.stages)
+
+    def __len__(self):
+        return len(self.stages)
+
+    def clear(self):
+        self.stages = []
+
+    def totals(self):
+        """ Aggregate the measurements by stage
+
+        Returns:
+            [dict]: stage name -> {'calls', 'time', 'input_size', 'output_count'}, in order of first call
+        """
+
+        totals = {}
+        for stage in self.stages:
+            total = totals.setdefault(stage.name, {'calls': 0, 'time': 0.0, 'input_size': 0, 'output_count': 0})
+            total['calls'] += 1
+            total['time'] += stage.time
+            total['input_size'] += stage.input_size or 0
+            total['output_count'] += stage.output_count or 0
+
+        return totals
+
+    def slowest(self, n: int = 10):
+        """ Slowest stage calls
+
+        Returns:
+            [list(Stage)]: at most n stages, slowest first
+        """
+
+        return sorted(self.stages, key=lambda stage: stage.time, reverse=True)[:n]
+
+
+class StageTracker:
+    """ Keeps track of the stages being run, so a failing or stuck bill can be reported
+        with the stage it stopped in. Use `start` as the start callback and the tracker itself
+        as the stage callback; both are forwarded to the optional callbacks.
+    """
+
+    def __init__(self, on_start=None, on_stage=None):
+        self.on_start = on_start
+        self.on_stage = on_stage
+        self.open = []
+
+    def start(self, bill, name: str):
+        self.open.append(name)
+        if self.on_start is not None:
+            self.on_start(bill, name)
+
+    def __call__(self, stage: Stage):
+        if stage.name in self.open:
+            del self.open[len(self.open) - 1 - self.open[::-1].index(stage.name)]
+        if self.on_stage is not None:
+            self.on_stage(stage)
+
+    @property
+    def current(self):
+        """ Innermost stage being run, None outside of any stage """
+
+        return self.open[-1] if self.open else None
+
+
+def timed_generator(target, name: str, generator, input_size, callback):
+    """ Pass the items of a generator through lazily, reporting the stage to `callback` when it is
+    exhausted or closed. The time is the time spent producing the items, the output count the
+    number of items produced.
+    """
+
+    elapsed, count = 0.0, 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - start
+            count += 1
+            yield item
+    finally:
+        generator.close()
+        callback(Stage(getattr(target, 'file', None), name, elapsed, input_size, count))
+
+
+def timed(target, name: str, method, measure_input, measure_output, callback, on_start=None):
+    """ Wrap a bound method so each call is reported to `callback` as a Stage, and its start
+    to `on_start(bill, name)` if given.
+    Calls answered from the memo of the target (see inaregParser.memoized) are not reported.
+    A generator is returned wrapped in timed_generator, so it stays lazy.
+    """
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if name in target._memo:
+            return method(*args, **kwargs)
+
+        if on_start is not None:
+            on_start(getattr(target, 'file', None), name)
+        input_size = measure_input(target, *args, **kwargs) if measure_input else None
+        start = time.perf_counter()
+        result = method(*args, **kwargs)
+        if inspect.isgenerator(result):
+            return timed_generator(target, name, result, input_size, callback)
+        elapsed = time.perf_counter() - start
+
+        output_count = measure_output(target, result) if measure_output else None
+        callback(Stage(getattr(target, 'file', None), name, elapsed, input_size, output_count))
+
+        return result
+
+    return wrapper
@@ -0,0 +1,295 @@
+""" Store of the cleaned texts of a corpus, so bills can be parsed again without their PDFs.
+
+    python inaregStore.py add store/ sample/ -j 8     # extract and clean the bills of a folder
+    python inaregStore.py list store/
+    python inaregStore.py vacuum store/               # drop the texts of replaced and removed bills
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import tempfile
+from functools import partial
+from multiprocessing import Pool
+
+from inaregCache import BillCache
+from inaregCorpus import find_bills
+from inaregParser import PARSER_VERSION, RegParser
+
+INDEX = "index.json"
+TEXTS = "texts.bin"
+
+
+def bill_text(file: str, cache: BillCache = None):
+    """ Parse a bill and make its store record. Used as the worker function of the process pool.
+
+    Returns:
+        [(str, str, str, dict)]: (File, Header, Body, Record), or (File, None, None, {'error'}) when the bill cannot be parsed
+    """
+
+    try:
+        parser = RegParser('', cache=cache)
+        parser.load_pdf(file, '.pdf' in file, parse_now=True)
+        return (file,) + make_record(parser)
+    except Exception as e:
+        return file, None, None, {'error': f"{type(e).__name__}: {e}"}
+
+
+def make_record(parser: RegParser):
+    """ Texts and metadata of a parsed bill
+
+    Returns:
+        [(str, str, dict)]: (Header, Body, {'title', 'info', 'segments'})
+    """
+
+    return parser.header, parser.body, {'title': parser.title, 'info': parser.info(), 'segments': parser.tree.offsets()}
+
+
+class TextStore:
+    """ The clean heading and body of every bill, packed in a single file that is memory-mapped
+        for reading, with an index of their byte offsets, the info() of every bill and the
+        offsets of its document tree.
+        Texts are appended, so a bill added again leaves its previous text unused until `vacuum`.
+        The index is kept in index.json, replaced atomically after the texts are written.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): store directory, created if missing
+        """
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.bills = {}
+        path = os.path.join(directory, INDEX)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.bills = json.load(f)['bills']
+
+        self.map = None
+        self._open()
+
+    def _open(self):
+        self.close()
+        path = os.path.join(self.directory, TEXTS)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _save(self):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': PARSER_VERSION, 'bills': self.bills}, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.directory, INDEX))
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, file):
+        return file in self.bills
+
+    def __iter__(self):
+        return iter(self.bills)
+
+    def __len__(self):
+        return len(self.bills)
+
+    def add(self, records):
+        """ Append bills to the store, replacing the bills already in it
+
+        Args:
+            records (iterable): (File, Header, Body, Record) of every bill, see bill_text
+
+        Returns:
+            [int]: number of bills added
+        """
+
+        added = 0
+        with open(os.path.join(self.directory, TEXTS), 'ab') as f:
+            offset = f.tell()
+            for file, header, body, record in records:
+                if 'error' in record:
+                    print(f"{file}: {record['error']}", file=sys.stderr)
+                    continue
+                record = dict(record, version=PARSER_VERSION)
+                for name, text in [('header', header), ('body', body)]:
+                    data = text.encode('utf-8')
+                    f.write(data)
+                    record[name] = [offset, len(data)]
+                    offset += len(data)
+                self.bills[file] = record
+                added += 1
+            f.flush()
+            os.fsync(f.fileno())
+
+        if added:
+            self._save()
+            self._open()
+
+        return added
+
+    def add_parser(self, parser: RegParser):
+        """ Store a parsed bill """
+
+        return self.add([(parser.file,) + make_record(parser)])
+
+    def add_files(self, files, workers: int = None, cache: BillCache = None, batch: int = 256):
+        """ Parse and store bills with a process pool; the index is saved every `batch` bills
+
+        Returns:
+            [int]: number of bills added
+        """
+
+        added = 0
+        with Pool(processes=workers) as pool:
+            records = []
+            for record in pool.imap_unordered(partial(bill_text, cache=cache), files):
+                records.append(record)
+                if len(records) >= batch:
+                    added += self.add(records)
+                    records = []
+            added += self.add(records)
+
+        return added
+
+    def remove(self, files):
+        """ Remove bills from the index; their texts are dropped by `vacuum`
+
+        Returns:
+            [int]: number of bills removed
+        """
+
+        removed = [file for file in files if self.bills.pop(file, None) is not None]
+        if removed:
+            self._save()
+
+        return len(removed)
+
+    def _text(self, span):
+        offset, size = span
+        return self.map[offset:offset + size].decode('utf-8')
+
+    def texts(self, file: str):
+        """ Clean heading and body of a bill
+
+        Returns:
+            [(str, str)]: (Header, Body)
+        """
+
+        record = self.bills[file]
+        return self._text(record['header']), self._text(record['body'])
+
+    def info(self, file: str):
+        """ info() of a bill, as it was when the bill was stored """
+
+        return self.bills[file]['info']
+
+    def segments(self, file: str):
+        """ Offsets of the document tree of a bill, None when it was stored by another parser version """
+
+        record = self.bills[file]
+        return record['segments'] if record.get('version') == PARSER_VERSION else None
+
+    def load(self, file: str, **kwargs):
+        """ Parser of a stored bill, loaded without its PDF (see RegParser.load_store)
+
+        Returns:
+            [RegParser]: parsed bill
+        """
+
+        parser = RegParser('', **kwargs)
+        parser.load_store(self, file)
+        return parser
+
+    def iter_bills(self, files=None, **kwargs):
+        """ Parsers of the stored bills, e.g. to run a new extractor over the whole corpus
+
+        Yields:
+            [RegParser]: parsed bill
+        """
+
+        for file in (self.bills if files is None else files):
+            yield self.load(file, **kwargs)
+
+    def vacuum(self):
+        """ Rewrite the texts file without the texts of replaced and removed bills
+
+        Returns:
+            [int]: number of bytes reclaimed
+        """
+
+        path = os.path.join(self.directory, TEXTS)
+        before = os.path.getsize(path) if os.path.exists(path) else 0
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        offset = 0
+        with os.fdopen(fd, 'wb') as f:
+            for record in self.bills.values():
+                for name in ('header', 'body'):
+                    start, size = record[name]
+                    f.write(self.map[start:start + size])
+                    record[name] = [offset, size]
+                    offset += size
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.close()
+        os.replace(tmp, path)
+        self._save()
+        self._open()
+
+        return before - offset
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Store of the cleaned texts of Indonesian bills.")
+    commands = ap.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="extract, clean and store bills")
+    add.add_argument("store", help="store directory")
+    add.add_argument("source", nargs="+", help="directories, glob patterns or PDF files")
+    add.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    add.add_argument("--cache", default=None, help="directory of the extraction/parsing cache")
+    add.add_argument("--cache-size", type=int, default=1024, help="maximum cache size in MiB (default: 1024)")
+
+    remove = commands.add_parser("remove", help="remove bills from the store")
+    remove.add_argument("store", help="store directory")
+    remove.add_argument("files", nargs="+", help="filenames of the bills, as they were added")
+
+    listing = commands.add_parser("list", help="list the stored bills")
+    listing.add_argument("store", help="store directory")
+
+    vacuum = commands.add_parser("vacuum", help="drop the texts of replaced and removed bills")
+    vacuum.add_argument("store", help="store directory")
+
+    args = ap.parse_args(argv)
+
+    with TextStore(args.store) as store:
+        if args.command == "add":
+            files = [f for source in args.source for f in (find_bills(source) if not os.path.isfile(source) else [source])]
+            cache = BillCache(args.cache, max_size=args.cache_size << 20) if args.cache else None
+            print(f"{store.add_files(files, args.workers, cache)} bills stored", file=sys.stderr)
+        elif args.command == "remove":
+            print(f"{store.remove(args.files)} bills removed", file=sys.stderr)
+        elif args.command == "list":
+            for file, record in store.bills.items():
+                info = record['info']
+                print(f"{file}\t{info['number']}\t{info['year']}\t{record['title']}")
+        elif args.command == "vacuum":
+            print(f"{store.vacuum()} bytes reclaimed", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import json
+import time
+from collections import deque
+from multiprocessing import Pipe, Process, cpu_count
+from multiprocessing.connection import wait
+
+
+_END = object()
+
+
+def _work(conn, task):
+    """ Worker process: run `task` on every item received, reporting stage starts and ends """
+
+    on_start = lambda bill, name: conn.send(('start', name))
+    on_stage = lambda stage: conn.send(('end', stage.name))
+    for item in iter(conn.recv, None):
+        conn.send(('done', task(item, on_start=on_start, on_stage=on_stage)))
+
+
+class Worker:
+    """ A worker process and the item it is working on """
+
+    def __init__(self, task):
+        self.conn, child = Pipe()
+        self.process = Process(target=_work, args=(child, task), daemon=True)
+        self.process.start()
+        child.close()
+        self.item = None
+        self.attempt = 0
+        self.started = None
+        self.stages = []
+
+    def assign(self, item, attempt: int):
+        self.item, self.attempt = item, attempt
+        self.started = time.monotonic()
+        self.stages = []
+        self.conn.send(item)
+
+    @property
+    def stage(self):
+        return self.stages[-1][0] if self.stages else None
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class Supervisor:
+    """ Runs bills in worker processes under time budgets.
+        A worker that exceeds the budget of its bill or of the stage it is in is killed and
+        replaced, and the bill is retried; a bill that still does not finish is reported as
+        failed with the stage it stopped in. A worker that crashes is handled the same way.
+    """
+
+    def __init__(self, task, workers: int = None, timeout: float = None, stage_timeout=None, retries: int = 1):
+        """
+        Args:
+            task (callable): task(item, on_start, on_stage) returning (JSON line, Failed or not),
+                e.g. inaregCorpus.parse_bill. It must be picklable.
+            workers (int, optional): number of worker processes. Defaults to os.cpu_count().
+            timeout (float, optional): time budget of a bill in seconds. Defaults to None (no limit).
+            stage_timeout (float or dict, optional): time budget of the innermost stage being run,
+                or budgets by stage name (e.g. {'parse_body': 10}). Defaults to None (no limit).
+            retries (int, optional): number of times a killed bill is tried again. Defaults to 1.
+        """
+
+        self.task = task
+        self.workers = workers or cpu_count()
+        self.timeout = timeout
+        self.stage_timeout = stage_timeout
+        self.retries = retries
+
+    def deadlines(self, worker: Worker):
+        """ Deadlines of the bill and stages a worker is in
+
+        Yields:
+            [(float, str)]: (Deadline, Description of the budget)
+        """
+
+        if self.timeout is not None:
+            yield worker.started + self.timeout, f"bill exceeded its {self.timeout}s budget"
+
+        if isinstance(self.stage_timeout, dict):
+            for name, started in worker.stages:
+                if name in self.stage_timeout:
+                    yield started + self.stage_timeout[name], f"stage {name} exceeded its {self.stage_timeout[name]}s budget"
+        elif self.stage_timeout is not None and worker.stages:
+            name, started = worker.stages[-1]
+            yield started + self.stage_timeout, f"stage {name} exceeded its {self.stage_timeout}s budget"
+
+    def run(self, items):
+        """ Run the task on every item.
+        Items are taken from `items` only when a worker is free, so it can be a generator
+        producing work on demand (see inaregJobs.run_job). Retried items go first.
+        Results are yielded as soon as a worker finishes, in completion order.
+
+        Yields:
+            [(str, bool)]: (JSON line, Failed or not) for every item
+        """
+
+        items = iter(items)
+        pending = deque()
+        idle, busy = [], {}
+
+        try:
+            while True:
+                while len(busy) < self.workers:
+                    if pending:
+                        item, attempt = pending.popleft()
+                    else:
+                        item, attempt = next(items, _END), 1
+                        if item is _END:
+                            break
+                    worker = idle.pop() if idle else Worker(self.task)
+                    worker.assign(item, attempt)
+                    busy[worker.conn] = worker
+                if not busy:
+                    break
+
+                deadlines = [deadline for worker in busy.values() for deadline, _ in self.deadlines(worker)]
+                timeout = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+
+                for conn in wait(list(busy), timeout):
+                    worker = busy[conn]
+                    try:
+                        while conn.poll():
+                            kind, value = conn.recv()
+                            if kind == 'start':
+                                worker.stages.append((value, time.monotonic()))
+                            elif kind == 'end':
+                                names = [name for name, _ in worker.stages]
+                                if value in names:
+                                    del worker.stages[len(names) - 1 - names[::-1].index(value)]
+                            else:
+                                del busy[conn]
+                                idle.append(worker)
+                                yield value
+                                break
+                    except (EOFError, OSError):
+                        del busy[conn]
+                        result = self.abort(worker, "WorkerDied: worker process exited", pending)
+                        if result is not None:
+                            yield result
+
+                now = time.monotonic()
+                for conn, worker in list(busy.items()):
+                    expired = [reason for deadline, reason in self.deadlines(worker) if deadline <= now]
+                    if expired:
+                        del busy[conn]
+                        result = self.abort(worker, f"Timeout: {expired[0]}", pending)
+                        if result is not None:
+                            yield result
+        finally:
+            for worker in idle:
+                worker.stop()
+            for worker in busy.values():
+                worker.kill()
+
+    def abort(self, worker: Worker, error: str, pending):
+        """ Kill a worker; retry its item or report it as failed
+
+        Returns:
+            [(str, bool)]: (JSON line, True) of the failed item, None if it is retried
+        """
+
+        worker.kill()
+        if worker.attempt <= self.retries:
+            pending.append((worker.item, worker.attempt + 1))
+            return None
+
+        return json.dumps({'file': worker.item, 'error': error, 'stage': worker.stage, 'attempts': worker.attempt}), True
@@ -0,0 +1,111 @@
+import functools
+import os
+import re
+from collections import Counter
+
+STOPWORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stopwords.txt')
+
+# characters stripped around the terms of a search index
+PUNCTUATION = '.,;:!?"\'()[]'
+
+# numbering and bullets such as "a.", "b)", "(c)", "1.", "2)" or "(3)"
+NUMBERING = re.compile(r"([a-z]\.)|([a-z]\))|(\([a-z]\))|(\d+\.)|(\d+\))|(\(\d+\))")
+
+
+@functools.lru_cache(maxsize=None)
+def load_stopwords(path: str = STOPWORDS_FILE):
+    """ Load a stopword list (one word per line), read once per path
+
+    Returns:
+        [frozenset]: stopwords
+    """
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return frozenset(f.read().splitlines())
+
+
+def tokenize(text: str):
+    """ Split a text into lowercase tokens, without surrounding dots and numbers
+
+    Returns:
+        [list]: tokens
+    """
+
+    return [w for w in (w.strip('.') for w in text.lower().split()) if not w.isdigit()]
+
+
+def terms(text: str, stopwords=frozenset()):
+    """ Tokenize a text like word_counts, also stripping the punctuation attached to words
+    ("parkir," -> "parkir"), so the terms of a text match the words of a query
+
+    Returns:
+        [list]: terms, in order
+    """
+
+    return [w for w in (w.strip(PUNCTUATION) for w in tokenize(text)) if w and not w.isdigit() and is_term(w, stopwords)]
+
+
+def is_term(word: str, stopwords=frozenset()):
+    """ Check whether a token is counted as a word: not numbering, not a single character, not a stopword """
+
+    return len(word) != 1 and word not in stopwords and not NUMBERING.match(word)
+
+
+def word_counts(text: str, exclude_stopword: bool = True):
+    """ Count the words of a text
+
+    Args:
+        text (str): text
+        exclude_stopword (bool, optional): if True, stopwords are not counted. Defaults to True.
+
+    Returns:
+        [Counter]: word -> frequency, in order of first occurence
+    """
+
+    counts = Counter(tokenize(text))
+    stopwords = load_stopwords() if exclude_stopword else frozenset()
+    for w in [w for w in counts if not is_term(w, stopwords)]:
+        del counts[w]
+
+    return counts
+
+
+def most_frequent(counts: Counter, n: int = -1):
+    """ Sort words by frequency (ties keep their order of first occurence)
+
+    Returns:
+        [list(tuple)]: list of word and frequency, at most n items (-1 for all)
+    """
+
+    result = sorted(counts.items(), reverse=True, key=lambda x: x[1])
+    return result if n == -1 else result[:n]
+
+
+class TermFrequencies:
+    """ Corpus-level term frequencies.
+        Keeps the total frequency of each word and the number of documents it appears in.
+    """
+
+    def __init__(self, exclude_stopword: bool = True):
+        self.exclude_stopword = exclude_stopword
+        self.term_frequency = Counter()
+        self.document_frequency = Counter()
+        self.documents = 0
+
+    def add(self, text: str = None, counts: Counter = None):
+        """ Add a document, given its text or its word counts
+
+        Returns:
+            [Counter]: word counts of the document
+        """
+
+        if counts is None:
+            counts = word_counts(text, self.exclude_stopword)
+        self.term_frequency.update(counts)
+        self.document_frequency.update(counts.keys())
+        self.documents += 1
+
+        return counts
+
+    def most_frequent(self, n: int = -1):
+        return most_frequent(self.term_frequency, n)
@@ -0,0 +1,86 @@
+""" clean_text and the page-by-page iter_clean_text against the original implementation, and the
+    parsed samples against their saved output.
+"""
+import glob
+import json
+import os
+import re
+
+import pytest
+
+from inaregParser import RegParser, is_noise_line
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = sorted(glob.glob(os.path.join(ROOT, "sample", "*.pdf")))
+
+
+def original_clean_text(text):
+    """ clean_text as it was before continuation markers were found in a single pass """
+
+    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\xff]', '', text)
+    text = re.sub(r'\s+(\.\s+){3}', '...', text)
+    text = re.sub(r'\s+…', '...', text)
+    text = re.sub(r'\s+\.\.\.[^[\.]]', '...', text)
+    text = ' '.join(t for t in text.split('\n') if not is_noise_line(t))
+
+    text = re.sub(' +', ' ', text)
+    found, rest = [], text
+    while m := re.search(r"(\s?\.\.\.\s)", rest):
+        s1, s2 = rest[:m.start()].split(), rest[m.end():].split()
+        if len(s1) >= 2 and len(s2) >= 2 and s1[-1] == s2[1] and s1[-2] == s2[0]:
+            found.append(f"{s1[-2]} {s1[-1]}{m.group(0)}")
+        rest = rest[m.end():]
+    for phrase in found:
+        text = text.replace(phrase, '')
+
+    return re.sub(r"\s{2,}", " ", text)
+
+
+def with_markers(pages):
+    """ Pages ending with the first two words of the next page followed by "...", as in printed bills """
+
+    result = []
+    for page, next_page in zip(pages, pages[1:] + [None]):
+        if next_page is not None:
+            lines = [t for t in next_page.split('\n') if t.strip() and not is_noise_line(t)]
+            words = lines[0].split() if lines else []
+            if len(words) >= 3:
+                page = page.rstrip('\n') + f"\n{words[0]} {words[1]} ...\n"
+        result.append(page)
+    return result
+
+
+@pytest.fixture(scope="module", params=SAMPLES, ids=lambda path: os.path.basename(path))
+def parser(request):
+    return RegParser(request.param, parse_now=True)
+
+
+def test_clean_text_unchanged(parser):
+    assert parser.clean_text(parser.rawtext) == original_clean_text(parser.rawtext)
+
+
+def test_iter_clean_text_joins_pages(parser):
+    assert ''.join(parser.iter_clean_text(parser.pages)) == parser.clean_text(parser.rawtext)
+
+
+def test_continuation_markers(parser):
+    pages = with_markers(parser.pages)
+    text = ''.join(pages)
+
+    assert len(parser.check_connection_phrase(parser.clean_text(''.join(parser.pages)))) < \
+        len(parser.check_connection_phrase(' '.join(t for t in text.split('\n') if not is_noise_line(t))))
+    assert parser.clean_text(text) == original_clean_text(text)
+    assert parser.clean_text(text) == parser.clean_text(parser.rawtext)
+    assert ''.join(parser.iter_clean_text(pages)) == parser.clean_text(text)
+    # page boundaries inside the markers, whatever the page size
+    for size in (1, 7, 50):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert ''.join(parser.iter_clean_text(chunks)) == parser.clean_text(text)
+
+
+def test_to_json_unchanged(parser):
+    name = os.path.splitext(os.path.basename(parser.file))[0]
+    with open(os.path.join(ROOT, "output", f"{name}.json"), encoding='utf-8') as f:
+        expected = json.load(f)
+
+    assert json.loads(json.dumps(parser.to_json(return_dict=True))) == expected
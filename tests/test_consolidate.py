@@ -0,0 +1,90 @@
+import pytest
+
+from inaregConsolidate import consolidate, split_ayat
+from inaregParser import RegParser
+
+HEADER = """UNDANG-UNDANG
+NOMOR {number} TAHUN {year} TENTANG {title}
+Menimbang : a. bahwa x;
+Mengingat : 1. Pasal 5 Undang-Undang Dasar;
+MEMUTUSKAN: Menetapkan : UNDANG-UNDANG TENTANG {title}.
+"""
+
+BASE = (
+    "BAB I KETENTUAN UMUM Pasal 1 Undang-Undang ini berlaku umum. "
+    "Pasal 2 (1) Setiap orang wajib lapor. (2) Kewajiban lama. (3) Ketentuan lain. "
+    "Pasal 3 Undang-Undang ini mulai berlaku pada tanggal diundangkan.\n"
+)
+
+AMENDED = "PERUBAHAN ATAS UNDANG-UNDANG NOMOR 1 TAHUN 2000 TENTANG X"
+
+
+def bill(tmp_path, name, header, body):
+    path = tmp_path / name
+    path.write_text(header + body, encoding='utf-8')
+    return RegParser(str(path), parse_now=True)
+
+
+def amend(tmp_path, instructions):
+    base = bill(tmp_path, "base.txt", HEADER.format(number=1, year=2000, title="X"), BASE)
+    amendment = bill(tmp_path, "amendment.txt", HEADER.format(number=2, year=2001, title=AMENDED),
+                     "Pasal I Beberapa ketentuan dalam Undang-Undang Nomor 1 Tahun 2000 tentang X diubah sebagai berikut: "
+                     + instructions + " Pasal II Undang-Undang ini mulai berlaku pada tanggal diundangkan.\n")
+    return consolidate(base, [amendment])
+
+
+def test_split_ayat_starts_at_first_ayat():
+    assert split_ayat("(2) Kewajiban baru. (3) Ketentuan baru.") == ("", [("2", "(2) Kewajiban baru."), ("3", "(3) Ketentuan baru.")])
+    assert split_ayat("(1) Satu sesuai ayat (3) dan (2) dua.") == ("", [("1", "(1) Satu sesuai ayat (3) dan"), ("2", "(2) dua.")])
+
+
+def test_replace_ayat(tmp_path):
+    consolidation = amend(tmp_path,
+                          '1. Ketentuan ayat (2) Pasal 2 diubah sehingga berbunyi sebagai berikut: "(2) Kewajiban baru." '
+                          '2. Ketentuan ayat (3) Pasal 2 diubah sehingga berbunyi sebagai berikut: (3) Ketentuan baru.')
+
+    assert consolidation.get("Pasal 2").text == "(1) Setiap orang wajib lapor. (2) Kewajiban baru. (3) Ketentuan baru."
+    assert [change.action for change in consolidation.changes] == ['replaced', 'replaced']
+
+
+def test_insert_ayat(tmp_path):
+    consolidation = amend(tmp_path,
+                          '1. Di antara ayat (1) dan ayat (2) Pasal 2 disisipkan 1 (satu) ayat, yakni ayat (1a) '
+                          'sehingga berbunyi sebagai berikut: "(1a) Ayat sisipan."')
+
+    assert consolidation.get("Pasal 2").text == \
+        "(1) Setiap orang wajib lapor. (1a) Ayat sisipan. (2) Kewajiban lama. (3) Ketentuan lain."
+
+
+def test_ayat_instruction_without_ayat_is_skipped(tmp_path):
+    consolidation = amend(tmp_path, '1. Ketentuan ayat (2) Pasal 2 diubah sehingga berbunyi sebagai berikut: "Kewajiban baru."')
+
+    assert consolidation.get("Pasal 2").text == "(1) Setiap orang wajib lapor. (2) Kewajiban lama. (3) Ketentuan lain."
+    assert [change.action for change in consolidation.changes] == ['skipped']
+
+
+@pytest.mark.parametrize("instruction", ['1. Ketentuan ayat (3) Pasal 2 dihapus.', '1. Ketentuan Pasal 2 ayat (3) dihapus.'])
+def test_delete_ayat(tmp_path, instruction):
+    consolidation = amend(tmp_path, instruction)
+
+    assert consolidation.get("Pasal 2").text == "(1) Setiap orang wajib lapor. (2) Kewajiban lama. (3) Dihapus."
+    assert [(change.action, change.pasal) for change in consolidation.changes] == [('replaced', 'Pasal 2')]
+
+
+def test_delete_ayat_range(tmp_path):
+    consolidation = amend(tmp_path, '1. Ketentuan ayat (2) sampai dengan ayat (3) Pasal 2 dihapus.')
+
+    assert consolidation.get("Pasal 2").text == "(1) Setiap orang wajib lapor. (2) Dihapus. (3) Dihapus."
+
+
+def test_delete_pasal_range(tmp_path):
+    consolidation = amend(tmp_path, '1. Ketentuan Pasal 1 sampai dengan Pasal 2 dihapus.')
+
+    assert [article.text for article in consolidation] == ["Dihapus.", "Dihapus.", "Undang-Undang ini mulai berlaku pada tanggal diundangkan."]
+    assert [(change.action, change.pasal) for change in consolidation.changes] == [('deleted', 'Pasal 1'), ('deleted', 'Pasal 2')]
+
+
+def test_delete_unknown_target_is_skipped(tmp_path):
+    consolidation = amend(tmp_path, '1. Ketentuan Pasal 8 sampai dengan Pasal 9 dihapus.')
+
+    assert [change.action for change in consolidation.changes] == ['skipped']
@@ -0,0 +1,45 @@
+""" Pairing of the articles of two versions of a bill """
+import random
+
+from inaregDiff import ADDED, MODIFIED, align, diff_bills
+
+WORDS = ("menteri pemerintah daerah pajak izin badan usaha warga negara hak kewajiban sanksi denda "
+         "pidana penjara tahun bulan laporan rencana anggaran dana wilayah kawasan hutan tanah air "
+         "laut udara energi pangan pendidikan kesehatan pekerja upah jaminan sosial data informasi").split()
+
+
+def bill(count, seed=0):
+    rnd = random.Random(seed)
+    return [(f"Pasal {n}", ' '.join(rnd.choice(WORDS) for _ in range(20))) for n in range(1, count + 1)]
+
+
+def modify(text):
+    words = text.split()
+    return ' '.join(words[:-3] + ["diubah", "dengan", "ketentuan"])
+
+
+def test_renumbered_and_modified():
+    # an article inserted at the start renumbers the others, and every article is modified
+    old = bill(60)
+    new = [("Pasal 1", "Undang-Undang ini berlaku untuk seluruh wilayah.")]
+    new += [(f"Pasal {n + 1}", modify(text)) for n, (_, text) in enumerate(old, 1)]
+    pairs = align(old, new)
+    assert {j: i for j, (i, _) in pairs.items()} == {j: j - 1 for j in range(1, len(new))}
+
+
+def test_far_articles_are_not_compared():
+    # the old version of the first new article is the last one, further than the window
+    old = bill(40)
+    new = [("Pasal 0", modify(old[-1][1]))] + old[:-1]
+    assert 0 not in align(old, new, window=5)
+    assert align(old, new, window=len(old))[0][0] == len(old) - 1
+
+
+def test_diff_statuses():
+    old = bill(10)
+    new = list(old)
+    new[3] = ("Pasal 4", modify(new[3][1]))
+    new.insert(5, ("Pasal 5A", "Ketentuan baru."))
+    statuses = {d.new: d.status for d in diff_bills(old, new)}
+    assert statuses["Pasal 4"] == MODIFIED
+    assert statuses["Pasal 5A"] == ADDED